@@ -0,0 +1,30 @@
+import numpy as np
+
+from benchmarks.run import Benchmark
+from common.programs import import_entrypoint
+
+
+ROUND_MINUTES = 3
+N_DRAWS = 100_000
+
+
+def benchmarks():
+    # Workouts are compiled up front, so there is no speech or sleep to stub
+    # out: these time the draws themselves
+    kickboxing = import_entrypoint('kickboxing')
+    samplers = kickboxing.default_samplers()
+    rng = np.random.default_rng(0)
+    for cat in ['box', 'kickbox', 'other']:
+        rnd = kickboxing.Round(cat, ROUND_MINUTES)
+        yield Benchmark(
+            f'round_compile[{cat},min={ROUND_MINUTES}]',
+            lambda rnd=rnd: rnd.compile(rng, 0))
+    lengths = rng.integers(1, kickboxing.MAX_COMBO + 1, size=N_DRAWS)
+    yield Benchmark(
+        f'markov_walk[kickbox,combos={N_DRAWS}]',
+        lambda: samplers['kickbox'].walk(rng, lengths))
+    yield Benchmark(
+        f'weighted_draw_batch[other,n={N_DRAWS // 100},k=5]',
+        lambda: samplers['other'].draw_batch(rng, N_DRAWS // 100, 5))
+    workout = kickboxing.Workout('kbc', 30, 3, 1, seed=0)
+    yield Benchmark('workout_compile[kbc,min=30]', workout.compile)
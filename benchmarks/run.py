@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+
+#------------------------------------------------------------------------------
+#
+# Usage:
+#   benchmarks/run.py [-k PATTERN] [--save] [--threshold RATIO]
+#                     [--baseline PATH]
+#
+#   Runs every benchmark (or those whose name contains PATTERN) offline and
+#   compares each against its JSON baseline:
+#   - --save: record the results as the new baseline (keeping the thresholds
+#     of benchmarks already in it)
+#   - --threshold RATIO: how many times slower than its baseline a benchmark
+#     may get before it counts as a regression, for benchmarks new to the
+#     baseline (default 1.5); edit the baseline file to tune one
+#   Exits with 1 if anything regressed.
+#
+#------------------------------------------------------------------------------
+import argparse
+import contextlib
+import importlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.programs import ROOT, in_directory
+
+
+BASELINE = f'{ROOT}/benchmarks/baseline.json'
+# Suite module -> directory it runs in ('tmp': a fresh temporary directory)
+SUITES = {
+    'strength': 'tmp',
+    'yoga': f'{ROOT}/yoga',
+    'kickboxing': f'{ROOT}/kickboxing'}
+THRESHOLD = 1.5
+MIN_TIME_S = 0.2  # each measurement runs a benchmark at least this long
+REPEAT = 5        # measurements per benchmark; the fastest is kept
+
+
+class Benchmark:
+    def __init__(self, name: str, fn):
+        '''<fn> (no arguments) is timed; anything it needs is set up before
+        the Benchmark is made
+        '''
+        self.name = name
+        self.fn = fn
+
+    def measure(self):
+        '''Seconds per call: the best of REPEAT runs of as many calls as
+        take MIN_TIME_S (like timeit's autorange)
+        '''
+        number = 1
+        while True:
+            elapsed = self._time(number)
+            if elapsed >= MIN_TIME_S:
+                break
+            number *= 2 if elapsed == 0 else max(
+                2, int(MIN_TIME_S / elapsed) + 1)
+        times = [elapsed] + [self._time(number) for _ in range(REPEAT - 1)]
+        return min(times) / number
+
+    def _time(self, number):
+        fn = self.fn
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return time.perf_counter() - start
+
+
+def main(args):
+    parser = argparse.ArgumentParser(prog='benchmarks/run.py')
+    parser.add_argument(
+        '-k', '--pattern', help='only benchmarks whose name contains this')
+    parser.add_argument(
+        '--save', help='save the results as the baseline', action='store_true')
+    parser.add_argument(
+        '--threshold',
+        help='allowed slowdown for benchmarks new to the baseline',
+        type=float,
+        default=THRESHOLD)
+    parser.add_argument('--baseline', default=BASELINE)
+    args = parser.parse_args(args[1:])
+    baseline = _load(args.baseline)
+    if baseline.get('machine', _machine()) != _machine():
+        print(
+            f'Warning: baseline is from {baseline["machine"]}, '
+            f'this is {_machine()}')
+    entries = baseline.get('benchmarks', {})
+    results = {}
+    regressions = 0
+    print(f'{"benchmark":48s} {"time":>10s} {"baseline":>10s} {"ratio":>6s}')
+    for name, seconds in run(args.pattern):
+        results[name] = seconds
+        entry = entries.get(name)
+        if entry is None:
+            print(f'{name:48s} {_fmt(seconds)} {"-":>10s}')
+            continue
+        ratio = seconds / entry['seconds']
+        regressed = ratio > entry['threshold']
+        regressions += regressed
+        print(
+            f'{name:48s} {_fmt(seconds)} {_fmt(entry["seconds"])} '
+            f'{ratio:6.2f}{"  REGRESSED" if regressed else ""}')
+    print(f'{len(results)} benchmarks, {regressions} regressed')
+    if args.save:
+        for name, seconds in results.items():
+            threshold = entries.get(name, {}).get('threshold', args.threshold)
+            entries[name] = {'seconds': seconds, 'threshold': threshold}
+        with open(args.baseline, 'w') as f:
+            json.dump(
+                {'machine': _machine(), 'benchmarks': dict(sorted(
+                    entries.items()))},
+                f,
+                indent=2)
+        print('Saved baseline to', args.baseline)
+    return 1 if regressions else 0
+
+
+def run(pattern: str = None):
+    '''Yields (name, seconds per call) of every benchmark in every suite'''
+    for suite, directory in SUITES.items():
+        with _in_directory(directory):
+            module = importlib.import_module(f'benchmarks.{suite}')
+            for benchmark in module.benchmarks():
+                name = f'{suite}.{benchmark.name}'
+                if pattern is None or pattern in name:
+                    yield name, benchmark.measure()
+
+
+def quiet(fn, *args):
+    '''fn(*args) without its printing'''
+    with contextlib.redirect_stdout(io.StringIO()):
+        return fn(*args)
+
+
+@contextlib.contextmanager
+def _in_directory(directory):
+    with contextlib.ExitStack() as stack:
+        if directory == 'tmp':
+            directory = stack.enter_context(tempfile.TemporaryDirectory())
+        with in_directory(directory):
+            yield
+
+
+def _load(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def _machine():
+    return (
+        f'{platform.system()} {platform.machine()}, '
+        f'Python {platform.python_version()}, {os.cpu_count()} CPUs')
+
+
+def _fmt(seconds):
+    for unit, scale in [('s', 1), ('ms', 1e-3), ('us', 1e-6)]:
+        if seconds >= scale:
+            return f'{seconds / scale:8.2f}{unit:>2s}'
+    return f'{seconds / 1e-9:8.2f}ns'
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
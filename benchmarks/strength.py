@@ -0,0 +1,70 @@
+import os
+import sys
+
+from benchmarks.run import ROOT, Benchmark
+
+sys.path.insert(0, f'{ROOT}/strength_training')
+from app.input_handling import InputReader
+from app.scheduler import Scheduler
+from app.weight_chart import DATA, WeightChart
+from app.weight_index import PlateAnnotator, WeightIndex
+
+
+# Copies of each plate pair in the real barbell inventory, for scaling
+PLATE_SCALES = [1, 2, 4]
+BAR = f'{ROOT}/strength_training/data/weights/bar_weights.csv'
+# (days, support exercises per day), each day also has one main exercise
+SIZES = [(4, 4), (16, 8), (64, 16)]
+PLAN_SIZE = (16, 8)  # schedule whose loadings are planned
+
+
+def benchmarks():
+    # Run in an empty temporary directory: make_chart writes its charts to
+    # ./data/weights
+    os.makedirs(DATA)
+    with open(BAR, 'r') as f:
+        header, counts = f.read().split()
+    counts = counts.split(',')
+    for scale in PLATE_SCALES:
+        scaled = [counts[0]] + [str(int(n) * scale) for n in counts[1:]]
+        with open(f'{DATA}/x{scale}_weights.csv', 'w') as f:
+            f.write(f'{header}\n{",".join(scaled)}\n')
+        n_plates = sum(int(n) for n in scaled[1:])
+        yield Benchmark(
+            f'make_chart[plates={n_plates}]',
+            lambda scale=scale: WeightChart().make_chart(f'x{scale}'))
+    path = 'input_plan.csv'
+    _write_input(path, *PLAN_SIZE)
+    schedule = Scheduler(
+        InputReader().get_exercises(path), is_extended=True).make_schedule()
+    for scale in PLATE_SCALES:
+        index = WeightIndex.from_inventory(f'x{scale}')
+        n_plates = 2 * sum(index.plate_counts.values())
+        # A new annotator each time, so nothing is memoized between calls
+        yield Benchmark(
+            f'plan_loadings[plates={n_plates},rows={len(schedule)}]',
+            lambda index=index: PlateAnnotator(
+                {'bar': index, 'dumb': index}).annotate(schedule, True))
+    for n_days, n_support in SIZES:
+        path = f'input_{n_days}x{n_support}.csv'
+        _write_input(path, n_days, n_support)
+        n = n_days * (n_support + 1)
+        yield Benchmark(
+            f'get_exercises[rows={n}]',
+            lambda path=path: InputReader().get_exercises(path))
+        exercises = InputReader().get_exercises(path)
+        yield Benchmark(
+            f'make_schedule[rows={n}]',
+            lambda exercises=exercises: Scheduler(
+                exercises, is_extended=True).make_schedule())
+
+
+def _write_input(path, n_days, n_support):
+    rows = ['day,type,exercise,training_max,increment_per_cycle']
+    for day in range(1, n_days + 1):
+        rows.append(f'{day},main,lift {day},{100 + day},5')
+        rows += [
+            f'{day},support,db support {day}.{i},{20 + i},2.5'
+            for i in range(n_support)]
+    with open(path, 'w') as f:
+        f.write('\n'.join(rows) + '\n')
@@ -0,0 +1,38 @@
+import numpy as np
+
+from benchmarks.run import Benchmark, quiet
+from common.programs import import_entrypoint
+
+
+LESSON_MINUTES = [10, 30, 60]
+K = 32  # lessons per batch for generate_lessons
+
+
+def benchmarks():
+    # Runs in yoga/, over every asana in the catalog
+    yoga = import_entrypoint('yoga')
+    stems = list(yoga.load_catalog().asanas)
+    yield Benchmark(
+        f'catalog_build[asanas={len(stems)}]',
+        lambda: yoga.Catalog.build())
+    yield Benchmark(
+        f'catalog_load[asanas={len(stems)}]', lambda: yoga.Catalog.load())
+    yield Benchmark(
+        f'load_all_asanas[asanas={len(stems)}]',
+        lambda: yoga.load_all_asanas(stems))
+    candidates = [
+        yoga.Asana(asana) for asana in yoga.load_all_asanas(stems)]
+    # Savasana last, as in every schedule
+    candidates.sort(key=lambda a: a.name == 'savasana')
+    rng = np.random.default_rng(0)
+    for minutes in LESSON_MINUTES:
+        yield Benchmark(
+            f'generate_lesson[asanas={len(candidates)},min={minutes}]',
+            lambda minutes=minutes: quiet(
+                yoga.generate_lesson, candidates, minutes * 60, True))
+        yield Benchmark(
+            f'generate_lessons[asanas={len(candidates)},min={minutes},'
+            f'k={K}]',
+            lambda minutes=minutes: quiet(
+                yoga.generate_lessons, candidates, minutes * 60, True, K,
+                rng))
@@ -0,0 +1,32 @@
+from time import monotonic
+
+from common.lazy import lazy_import
+
+asyncio = lazy_import('asyncio')
+
+
+class RealClock:
+    '''Wall-clock time for real sessions'''
+    def now(self):
+        return monotonic()
+
+    async def sleep(self, seconds):
+        await asyncio.sleep(seconds)
+
+
+class VirtualClock:
+    '''Simulated time: sleeping just moves the clock forward, so a whole
+    session runs in milliseconds
+    '''
+    def __init__(self, start: float = 0.):
+        self.t = start
+
+    def now(self):
+        return self.t
+
+    async def sleep(self, seconds):
+        self.advance(seconds)
+        await asyncio.sleep(0)
+
+    def advance(self, seconds):
+        self.t += max(seconds, 0)
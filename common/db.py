@@ -0,0 +1,23 @@
+import os
+from contextlib import closing, contextmanager
+
+from common.lazy import lazy_import
+
+sqlite3 = lazy_import('sqlite3')
+
+
+DATA = os.path.expanduser('~/.local/share/fitness')
+
+
+@contextmanager
+def connect(path: str, schema: str = None):
+    '''SQLite connection to <path> as one transaction: committed if the block
+    succeeds, rolled back if it raises, and closed either way
+    Args:
+    - schema: SQL script run first (e.g. CREATE ... IF NOT EXISTS)
+    '''
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with closing(sqlite3.connect(path)) as db, db:
+        if schema is not None:
+            db.executescript(schema)
+        yield db
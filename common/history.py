@@ -0,0 +1,157 @@
+import datetime
+
+from common.db import DATA, connect
+from common.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+DB = f'{DATA}/history.sqlite'
+# One row per exercise per session. What <amount> means depends on the
+# program: seconds held (yoga), times done (kickboxing moves and exercises),
+# training max (strength). The aggregate tables are kept up to date by a
+# trigger on every insert, so reading them never rescans the events.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY,
+    date TEXT NOT NULL,  -- YYYY-MM-DD
+    program TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    amount REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_date ON events(date);
+CREATE INDEX IF NOT EXISTS events_program_exercise
+    ON events(program, exercise, date);
+CREATE TABLE IF NOT EXISTS exercise_stats (
+    program TEXT NOT NULL,
+    exercise TEXT NOT NULL,
+    n INTEGER NOT NULL,      -- sessions it was in
+    total REAL NOT NULL,     -- sum of amounts
+    last_date TEXT NOT NULL,
+    PRIMARY KEY (program, exercise)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS weekly_volume (
+    program TEXT NOT NULL,
+    week TEXT NOT NULL,      -- the Monday
+    total REAL NOT NULL,
+    PRIMARY KEY (program, week)
+) WITHOUT ROWID;
+CREATE TRIGGER IF NOT EXISTS events_aggregate AFTER INSERT ON events
+BEGIN
+    INSERT INTO exercise_stats
+        VALUES (NEW.program, NEW.exercise, 1, NEW.amount, NEW.date)
+        ON CONFLICT (program, exercise) DO UPDATE SET
+            n = n + 1,
+            total = total + NEW.amount,
+            last_date = max(last_date, NEW.date);
+    INSERT INTO weekly_volume
+        VALUES (
+            NEW.program,
+            date(NEW.date, 'weekday 0', '-6 days'),
+            NEW.amount)
+        ON CONFLICT (program, week) DO UPDATE SET
+            total = total + NEW.amount;
+END;
+'''
+STALE_DAYS = 14  # not done for this long counts as fully stale
+MAX_BALANCE = 2  # most a weight is scaled up (or 1/x down) by balance
+
+
+class History:
+    def __init__(self, path: str = DB):
+        '''What was actually done, by every program, in one SQLite file
+        (see SCHEMA)
+        '''
+        self.path = path
+
+    def _connect(self):
+        return connect(self.path, SCHEMA)
+
+    def record(self, program: str, amounts, date: str = None):
+        '''Add a session's [(exercise, amount), ...] (or {exercise: amount})
+        on <date> (YYYY-MM-DD, default today)
+        '''
+        date = date or datetime.date.today().isoformat()
+        if isinstance(amounts, dict):
+            amounts = amounts.items()
+        with self._connect() as db:
+            db.executemany(
+                'INSERT INTO events (date, program, exercise, amount) '
+                'VALUES (?, ?, ?, ?)',
+                [(date, program, exercise, float(amount))
+                 for exercise, amount in amounts])
+
+    def stats(self, program: str, exercises=None):
+        '''{exercise: (n sessions, total amount, last date)}, for
+        <exercises> (default all) of <program>; one primary key lookup each
+        '''
+        with self._connect() as db:
+            if exercises is None:
+                rows = db.execute(
+                    'SELECT exercise, n, total, last_date '
+                    'FROM exercise_stats WHERE program = ?',
+                    (program,))
+            else:
+                exercises = list(exercises)
+                rows = db.execute(
+                    'SELECT exercise, n, total, last_date '
+                    'FROM exercise_stats WHERE program = ? '
+                    f'AND exercise IN ({",".join("?" * len(exercises))})',
+                    [program] + exercises)
+            return {exercise: tuple(stats) for exercise, *stats in rows}
+
+    def latest(self, program: str, exercises):
+        '''{exercise: amount of its most recent event}, for those of
+        <exercises> of <program> that have any
+        '''
+        exercises = list(exercises)
+        with self._connect() as db:
+            rows = db.execute(
+                'SELECT exercise, amount FROM events AS e '
+                'WHERE program = ? '
+                f'AND exercise IN ({",".join("?" * len(exercises))}) '
+                'AND id = (SELECT max(id) FROM events '
+                'WHERE program = e.program AND exercise = e.exercise)',
+                [program] + exercises)
+            return dict(rows.fetchall())
+
+    def weekly_volume(self, program: str, since: str = None):
+        '''[(week (its Monday), total amount), ...] in order'''
+        with self._connect() as db:
+            return db.execute(
+                'SELECT week, total FROM weekly_volume '
+                'WHERE program = ? AND week >= ? ORDER BY week',
+                (program, since or '')).fetchall()
+
+    def staleness(self, program: str, exercises: list, today: str = None):
+        '''How long ago each of <exercises> was last done, from 0 (today) to
+        1 (STALE_DAYS ago or more, or never), as an array
+        '''
+        today = datetime.date.fromisoformat(
+            today or datetime.date.today().isoformat())
+        stats = self.stats(program, set(exercises))
+        days = [
+            (today - datetime.date.fromisoformat(stats[e][2])).days
+            if e in stats else STALE_DAYS
+            for e in exercises]
+        return np.clip(np.array(days, dtype=float) / STALE_DAYS, 0, 1)
+
+    def balance(self, program: str, weights: dict):
+        '''<weights> ({exercise: weight}) scaled toward doing each exercise
+        as often as its weight says: those done more than their share so
+        far are scaled down, those done less are scaled up (by at most
+        MAX_BALANCE). The original weights stay the prior: with no history
+        they come back unchanged.
+        '''
+        stats = self.stats(program, weights)
+        done = np.array([stats.get(e, (0, 0))[1] for e in weights])
+        if done.sum() == 0:
+            return dict(weights)
+        prior = np.array(list(weights.values()), dtype=float)
+        share = prior / prior.sum()
+        # Add one session's worth of the prior so rare exercises are not
+        # scaled by noise
+        actual = (done + share * done.mean()) / (
+            done.sum() + done.mean())
+        scale = np.clip(share / actual, 1 / MAX_BALANCE, MAX_BALANCE)
+        return dict(zip(weights, (prior * scale).tolist()))
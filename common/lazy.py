@@ -0,0 +1,25 @@
+import importlib.util
+import sys
+
+
+def lazy_import(name: str):
+    '''Module <name>, only actually imported the first time one of its
+    attributes is used, so heavy modules (numpy, pandas, PIL, asyncio) cost
+    nothing in runs that never need them (e.g. --help)
+    '''
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f'No module named {name!r}', name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    # As a real import would, make a submodule an attribute of its package
+    # (e.g. concurrent.futures, which asyncio reaches that way)
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    loader.exec_module(module)
+    return module
@@ -0,0 +1,37 @@
+import contextlib
+import importlib.util
+import os
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_entrypoint(program: str):
+    '''<program>'s (its directory, e.g. "yoga") entrypoint module. Each
+    program has its own "entrypoint", so each is imported under its
+    program's name, which lets one process use several of them.
+    '''
+    directory = f'{ROOT}/{program}'
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    name = f'{program}_entrypoint'
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            name, f'{directory}/entrypoint.py')
+        sys.modules[name] = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(sys.modules[name])
+    return sys.modules[name]
+
+
+@contextlib.contextmanager
+def in_directory(directory: str):
+    '''Run the block in <directory> (programs find their data files relative
+    to their own directory)
+    '''
+    cwd = os.getcwd()
+    os.chdir(directory)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
@@ -0,0 +1,232 @@
+from __future__ import annotations  # so np stays unimported until used
+
+import bisect
+
+from common.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+GUIDE_PER_ITEM = 16  # guide table entries per item (see MarkovSampler)
+# Below this many sequences, walking them one item at a time in Python is
+# faster than the per-step array operations (e.g. one kickboxing round)
+SMALL_WALK = 100
+
+
+def _frozen(arr):
+    arr.flags.writeable = False
+    return arr
+
+
+class AliasSampler:
+    def __init__(self, items, weights):
+        '''Weighted draws with replacement in O(1) each, from an alias table
+        built once (Vose's method)
+        Args:
+        - items: what to draw
+        - weights: relative weight of each item (need not sum to 1)
+        '''
+        weights = np.asarray(weights, dtype=float)
+        n = len(weights)
+        self.items = _frozen(np.array(items))
+        scaled = weights * n / weights.sum()
+        prob = np.ones(n)
+        alias = np.arange(n)
+        small = [i for i in range(n) if scaled[i] < 1]
+        large = [i for i in range(n) if scaled[i] >= 1]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            prob[s] = scaled[s]
+            alias[s] = l
+            scaled[l] -= 1 - scaled[s]
+            (small if scaled[l] < 1 else large).append(l)
+        # Whatever is left over is 1 up to rounding error
+        self.prob = _frozen(prob)
+        self.alias = _frozen(alias)
+
+    @classmethod
+    def from_dict(cls, dct: dict):
+        '''Sampler over the keys of <dct>, weighted by its values'''
+        return cls(list(dct.keys()), list(dct.values()))
+
+    def __len__(self):
+        return len(self.prob)
+
+    def draw(self, rng: np.random.Generator, size=None):
+        '''Indices of <size> items (any shape), drawn with replacement'''
+        i = rng.integers(len(self.prob), size=size)
+        u = rng.random(size=size)
+        return np.where(u < self.prob[i], i, self.alias[i])
+
+    def sample(self, rng: np.random.Generator, size=None):
+        '''Like draw, but returns the items'''
+        return self.items[self.draw(rng, size)]
+
+
+class WeightedSampler:
+    def __init__(self, items, weights):
+        '''Weighted draws without replacement: each item gets a random key
+        (exponential / weight) and the k smallest keys win, which picks the
+        same way as drawing one at a time and renormalizing after each pick
+        Args:
+        - items: what to draw
+        - weights: relative weight of each item
+        '''
+        self.items = _frozen(np.array(items))
+        self.weights = _frozen(np.asarray(weights, dtype=float))
+
+    @classmethod
+    def from_dict(cls, dct: dict):
+        return cls(list(dct.keys()), list(dct.values()))
+
+    def __len__(self):
+        return len(self.weights)
+
+    def draw(self, rng: np.random.Generator, k: int):
+        '''Indices of <k> distinct items, in the order they were picked'''
+        return self.draw_batch(rng, 1, k)[0]
+
+    def draw_batch(self, rng: np.random.Generator, n_samples: int, k: int):
+        '''<n_samples> independent draws of <k> distinct items: array of
+        shape (n_samples, k)
+        '''
+        if k > len(self):
+            raise ValueError(f'Cannot draw {k} of {len(self)} items')
+        if k == 0:
+            return np.zeros((n_samples, 0), dtype=int)
+        keys = rng.exponential(size=(n_samples, len(self))) / self.weights
+        top = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        order = np.argsort(np.take_along_axis(keys, top, axis=1), axis=1)
+        return np.take_along_axis(top, order, axis=1)
+
+    def sample(self, rng: np.random.Generator, k: int):
+        return self.items[self.draw(rng, k)]
+
+
+class MarkovSampler:
+    def __init__(self, items, weights, affinity=None, start=None):
+        '''Sequences (e.g. combos) where each item depends on the one before:
+        a Markov chain whose transition probabilities are <weights> scaled by
+        how well each pair of items goes together, with cumulative tables
+        built once so that any number of sequences are drawn in a few
+        vectorized steps
+
+        The weights stay the stationary distribution: the transitions are
+        rescaled (symmetric Sinkhorn scaling of <affinity>) so that, in the
+        long run, and at every step when starting from <weights>, each item
+        is drawn in proportion to its weight.
+        Args:
+        - items: what to draw
+        - weights: relative weight of each item
+        - affinity: symmetric (n, n) array, how much more (> 1) or less
+          (< 1, 0 never) likely item j is to follow item i; default all 1
+          (independent draws)
+        - start: relative weight of each item as the first of a sequence
+          (default <weights>)
+        '''
+        weights = np.asarray(weights, dtype=float)
+        n = len(weights)
+        self.items = _frozen(np.array(items))
+        self.weights = _frozen(weights / weights.sum())
+        affinity = np.ones((n, n)) if affinity is None else np.asarray(
+            affinity, dtype=float)
+        if not np.allclose(affinity, affinity.T):
+            raise ValueError('affinity must be symmetric')
+        # Find x so that x_i * sum_j affinity_ij * x_j = weight_i; then
+        # transitions from i (affinity_ij * x_j, normalized) are reversible
+        # with the weights as their stationary distribution
+        x = np.sqrt(self.weights)
+        for _ in range(1000):
+            x_new = np.sqrt(x * self.weights / (affinity @ x))
+            if np.allclose(x_new, x, rtol=1e-12, atol=0):
+                break
+            x = x_new
+        transition = affinity * x
+        transition /= transition.sum(axis=1, keepdims=True)
+        self.transition = _frozen(transition)
+        start = self.weights if start is None else np.asarray(
+            start, dtype=float)
+        # Row i: CDF of the item after item i; row n: of the first item
+        cdf = np.cumsum(
+            np.vstack([transition, start / start.sum()]), axis=1)
+        cdf[:, -1] = 1
+        self.cdf = _frozen(cdf)
+        self._cdf_rows = cdf.tolist()
+        # Guide table: guide[i, g] is the first item whose row i CDF is
+        # above g / GUIDE_SIZE, so a uniform u is inverted by starting from
+        # guide[i, int(u * GUIDE_SIZE)] and stepping over the (usually no)
+        # items left below u, for every sequence at once
+        self.guide_size = GUIDE_PER_ITEM * n
+        self.guide = _frozen(np.array([
+            np.searchsorted(row, np.arange(self.guide_size) / self.guide_size,
+                            side='right')
+            for row in cdf]))
+
+    @classmethod
+    def from_dict(cls, dct: dict, affinity: dict = None, start: dict = None):
+        '''Sampler over the keys of <dct>, weighted by its values
+        Args:
+        - affinity: {(item, item): affinity} for the pairs (either order)
+          that are not 1
+        - start: {item: weight} as the first of a sequence, for the items
+          whose start weight differs from their weight in <dct>
+        '''
+        items = list(dct)
+        position = {item: i for i, item in enumerate(items)}
+        matrix = np.ones((len(items), len(items)))
+        for (a, b), value in (affinity or {}).items():
+            if a in position and b in position:
+                matrix[position[a], position[b]] = value
+                matrix[position[b], position[a]] = value
+        start = None if start is None else [
+            start.get(item, dct[item]) for item in items]
+        return cls(items, list(dct.values()), matrix, start)
+
+    def __len__(self):
+        return len(self.items)
+
+    def walk(self, rng: np.random.Generator, lengths):
+        '''Indices of len(<lengths>) sequences of those lengths, one after
+        the other
+        '''
+        lengths = np.asarray(lengths, dtype=int)
+        if len(lengths) < SMALL_WALK:
+            return self._walk_small(rng, lengths)
+        steps = int(lengths.max(initial=0))
+        states = np.zeros((len(lengths), steps), dtype=int)
+        if steps == 0:
+            return states.ravel()
+        states[:, 0] = self._next(
+            np.full(len(lengths), len(self)), rng.random(len(lengths)))
+        for t in range(1, steps):
+            # Only the sequences that are not over yet
+            live = np.flatnonzero(lengths > t)
+            states[live, t] = self._next(
+                states[live, t - 1], rng.random(len(live)))
+        return states[np.arange(steps) < lengths[:, None]]
+
+    def _walk_small(self, rng, lengths):
+        # One uniform per item, drawn at once, each inverted by bisecting
+        # its row's CDF
+        u = iter(rng.random(int(lengths.sum())).tolist())
+        rows = self._cdf_rows
+        states = []
+        for length in lengths.tolist():
+            state = len(rows) - 1  # the start row
+            for _ in range(length):
+                state = bisect.bisect_right(rows[state], next(u))
+                states.append(state)
+        return np.array(states, dtype=int)
+
+    def _next(self, rows, u):
+        # Inverse CDF of <u> in each of <rows> (see guide)
+        items = self.guide[rows, (u * self.guide_size).astype(int)]
+        while True:
+            below = self.cdf[rows, items] <= u
+            if not below.any():
+                return items
+            items += below
+
+    def sample(self, rng: np.random.Generator, lengths):
+        '''Like walk, but returns the items'''
+        return self.items[self.walk(rng, lengths)]
@@ -0,0 +1,237 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+
+from common.programs import ROOT, import_entrypoint, in_directory
+
+
+CACHE_SIZE = 256      # generated workouts kept (least recently used dropped)
+N_LATENCIES = 1000    # latest request latencies kept per endpoint
+PERCENTILES = [50, 90, 99]
+STRENGTH_DATA = f'{ROOT}/strength_training/data'
+REASONS = {
+    200: 'OK', 400: 'Bad Request', 404: 'Not Found',
+    500: 'Internal Server Error'}
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = CACHE_SIZE):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        # Requests are handled in worker threads; make() runs unlocked, so
+        # two misses on one key may both make it (the last one is kept)
+        self.lock = threading.Lock()
+
+    def get(self, key, make):
+        '''Cached value for <key>, or make() (then cached)'''
+        with self.lock:
+            if key in self.items:
+                self.hits += 1
+                self.items.move_to_end(key)
+                return self.items[key]
+            self.misses += 1
+        value = make()
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            if len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+        return value
+
+
+class Service:
+    def __init__(self, cache_size: int = CACHE_SIZE):
+        '''Generates kickboxing plans, yoga lessons and strength schedules as
+        JSON, from one process that keeps everything it needs resident: the
+        programs and their imports, the yoga catalog, the strength templates
+        and plate index, and the kickboxing samplers. Only local files are
+        read, and only once.
+
+        Generated workouts are cached by (program, parameters, seed). A
+        request without a seed gets a random one, returned in the response
+        so the same workout can be asked for again.
+        '''
+        self.cache = LRUCache(cache_size)
+        self.latencies = {}  # endpoint -> deque of seconds
+        self.routes = {
+            '/kickboxing': self.kickboxing,
+            '/yoga': self.yoga,
+            '/strength': self.strength,
+            '/metrics': self.metrics}
+        self._warm()
+
+    def _warm(self):
+        # Programs read their data files relative to their own directory, so
+        # everything that reads them is loaded here, once, in that directory
+        self.kb = import_entrypoint('kickboxing')
+        self.kb.default_samplers()
+        self.yoga_program = import_entrypoint('yoga')
+        with in_directory(f'{ROOT}/yoga'):
+            self.yoga_program.load_catalog()
+        self.strength_program = import_entrypoint('strength_training')
+        from app.cycle import _annotator
+        from app.input_handling import InputReader
+        self.reader = InputReader()
+        with in_directory(f'{ROOT}/strength_training'):
+            _annotator()
+
+    def handle(self, path: str):
+        '''(status, JSON-able body) for a GET of <path>'''
+        url = urlsplit(path)
+        route = self.routes.get(url.path)
+        if route is None:
+            return 404, {'error': f'No such endpoint {url.path}'}
+        start = time.perf_counter()
+        try:
+            return 200, route(dict(parse_qsl(url.query)))
+        except (KeyError, ValueError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            return 500, {'error': f'{type(e).__name__}: {e}'}
+        finally:
+            self.latencies.setdefault(
+                url.path, deque(maxlen=N_LATENCIES)).append(
+                    time.perf_counter() - start)
+
+    def kickboxing(self, params):
+        # Fixed move weights (no history), so the same seed always gives the
+        # same plan
+        seed = _seed(params)
+        key = (
+            params.get('category', 'kbc'),
+            float(params.get('time', 30)),
+            float(params.get('work', 3)),
+            float(params.get('rest', 1)))
+        return self.cache.get(
+            ('kickboxing', key, seed),
+            lambda: self.kb.Workout(*key, seed=seed).compile().to_dict())
+
+    def yoga(self, params):
+        seed = _seed(params)
+        key = (
+            params.get('week', '1'),
+            float(params.get('time', 20)),
+            _bool(params.get('corpse', 'true')),
+            _bool(params.get('exact', 'false')),
+            float(params.get('lmb', 0.9)))
+        return self.cache.get(
+            ('yoga', key, seed), lambda: self._make_lesson(*key, seed))
+
+    def _make_lesson(self, week, minutes, do_corpse, exact, lmb, seed):
+        program = self.yoga_program
+        rng = np.random.default_rng(seed)
+        try:
+            week = int(week)
+        except ValueError:
+            asana_list = program.load_catalog().focused_schedule(week)
+        else:
+            if not exact:
+                week = program.choose_week(week, lmb, rng)
+            asana_list = program.load_catalog().weekly_schedule(week)
+        candidates = [
+            program.Asana(asana, rng=rng)
+            for asana in program.load_all_asanas(asana_list)]
+        lesson = program.generate_lessons(
+            candidates, minutes * 60, do_corpse, rng=rng)[0]
+        return {
+            'week': week,
+            'seed': seed,
+            'asanas': [
+                {'asana': a.name,
+                 'english': a.english,
+                 'hindi': a.hindi,
+                 'sides': a.sides,
+                 'time_per_side': a.time_per_side,
+                 'img': a.img}
+                for a in lesson]}
+
+    def strength(self, params):
+        # Only input files in the strength data directory can be used
+        infile = os.path.basename(params.get('input', 'input.csv'))
+        path = f'{STRENGTH_DATA}/{infile}'
+        if not os.path.exists(path):
+            raise ValueError(f'No input file {infile}')
+        key = (
+            infile,
+            os.path.getmtime(path),  # so edited inputs are not stale
+            _bool(params.get('plates', 'false')),
+            int(params.get('cycles', 1)),
+            _bool(params.get('extended', 'true')))
+        return self.cache.get(
+            ('strength', key, None), lambda: self._make_schedule(path, *key))
+
+    def _make_schedule(self, path, infile, _, do_plates, n_cycles, extended):
+        from app.cycle import make_cycle
+        schedule = make_cycle(
+            self.reader.get_exercises(path),
+            is_extended=extended,
+            do_plates=do_plates,
+            n_cycles=n_cycles)
+        return {
+            'input': infile,
+            'schedule': json.loads(
+                schedule.to_json(orient='split', index=False))}
+
+    def metrics(self, params):
+        return {
+            'cache': {
+                'size': len(self.cache.items),
+                'hits': self.cache.hits,
+                'misses': self.cache.misses},
+            # Copies, as other requests' threads may be adding to them
+            'latency_ms': {
+                endpoint: {
+                    'n': len(latencies),
+                    **{f'p{p}': v * 1000 for p, v in zip(
+                        PERCENTILES,
+                        np.percentile(latencies, PERCENTILES).tolist())}}
+                for endpoint, latencies in [
+                    (endpoint, list(latencies))
+                    for endpoint, latencies in list(self.latencies.items())]}}
+
+    async def _client(self, reader, writer):
+        try:
+            request = await reader.readline()
+            # Headers are read and ignored
+            while (await reader.readline()) not in [b'\r\n', b'\n', b'']:
+                pass
+            parts = request.decode('latin-1').split()
+            if len(parts) != 3 or parts[0] != 'GET':
+                status, body = 400, {'error': 'Only GET is supported'}
+            else:
+                # In a worker thread, so one slow workout does not hold up
+                # every other client
+                status, body = await asyncio.to_thread(
+                    self.handle, parts[1])
+            data = json.dumps(body).encode()
+            writer.write(
+                f'HTTP/1.1 {status} {REASONS[status]}\r\n'
+                'Content-Type: application/json\r\n'
+                f'Content-Length: {len(data)}\r\n'
+                'Connection: close\r\n\r\n'.encode() + data)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host: str, port: int):
+        server = await asyncio.start_server(self._client, host, port)
+        print(f'Serving on http://{host}:{port}/ ({", ".join(self.routes)})')
+        async with server:
+            await server.serve_forever()
+
+
+def _seed(params):
+    return int(params['seed']) if 'seed' in params else random.getrandbits(32)
+
+
+def _bool(value):
+    return value.lower() in ['true', '1', 'yes']
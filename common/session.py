@@ -0,0 +1,112 @@
+from common.clock import RealClock, VirtualClock
+from common.lazy import lazy_import
+
+asyncio = lazy_import('asyncio')
+
+
+class Cue:
+    def __init__(self, at: float, label: str, action, channel: str):
+        '''Something to do <at> seconds after the session starts
+        Args:
+        - action: function taking no arguments (e.g. say something)
+        - channel: cues on the same channel (e.g. "speech") run one at a
+          time, in order; different channels run concurrently
+        '''
+        self.at = at
+        self.label = label
+        self.action = action
+        self.channel = channel
+        self.started = None
+        self.finished = None
+
+    @property
+    def drift(self):
+        return None if self.started is None else self.started - self.at
+
+
+def print_cue(cue):
+    '''Sink that prints each cue with its start time'''
+    print(f'{cue.started:8.2f}  {cue.label}')
+
+
+class Session:
+    def __init__(self, clock=None, sink=None):
+        '''Runs cues against absolute deadlines from the session start, so
+        time spent speaking or showing images never pushes later cues back
+        Args:
+        - clock: RealClock or VirtualClock (see common.clock); by default
+          a RealClock when run, and a VirtualClock when simulated
+        - sink: optional function called with each cue as it starts (e.g.
+          print_cue, or a list's append to collect the timeline); what is
+          shown while a session runs goes through it
+        '''
+        self.clock = clock
+        self.sink = sink
+        self.cues = []
+        self.elapsed = None
+
+    def add(self, at: float, label: str, action, channel: str = 'speech'):
+        self.cues.append(Cue(at, label, action, channel))
+
+    @property
+    def planned_time(self):
+        return max((cue.at for cue in self.cues), default=0)
+
+    def run(self):
+        '''Run every cue; returns them with actual start/finish times'''
+        return asyncio.run(self._run())
+
+    def simulate(self):
+        '''Fast-forward through the session on the VirtualClock (a new one
+        unless one was given) without running any actions: every cue starts
+        exactly on time and is passed to the sink. Returns the cues.
+        '''
+        if self.clock is None:
+            self.clock = VirtualClock()
+        clock = self.clock
+        start = clock.now()
+        for cue in sorted(self.cues, key=lambda c: c.at):
+            clock.advance(start + cue.at - clock.now())
+            cue.started = cue.finished = clock.now() - start
+            if self.sink is not None:
+                self.sink(cue)
+        self.elapsed = clock.now() - start
+        return self.cues
+
+    async def _run(self):
+        if self.clock is None:
+            self.clock = RealClock()
+        clock = self.clock
+        locks = {}
+        tasks = []
+        start = clock.now()
+        # Stable sort: cues due at the same time keep the order added
+        for cue in sorted(self.cues, key=lambda c: c.at):
+            delay = start + cue.at - clock.now()
+            if delay > 0:
+                await clock.sleep(delay)
+            lock = locks.setdefault(cue.channel, asyncio.Lock())
+            tasks.append(asyncio.create_task(self._fire(cue, lock, start)))
+        await asyncio.gather(*tasks)
+        self.elapsed = clock.now() - start
+        return self.cues
+
+    async def _fire(self, cue, lock, start):
+        async with lock:
+            cue.started = self.clock.now() - start
+            if self.sink is not None:
+                self.sink(cue)
+            await asyncio.to_thread(cue.action)
+            cue.finished = self.clock.now() - start
+
+    def report(self):
+        '''Print planned vs actual start time of every cue'''
+        print(f'{"planned":>9s} {"actual":>9s} {"drift":>7s}  cue')
+        for cue in sorted(self.cues, key=lambda c: c.at):
+            print(
+                f'{cue.at:9.2f} {cue.started:9.2f} {cue.drift:+7.2f}  '
+                f'{cue.label}')
+        drifts = [abs(cue.drift) for cue in self.cues]
+        print(
+            f'Planned {self.planned_time:.1f} s, took {self.elapsed:.1f} s; '
+            f'max drift {max(drifts, default=0):.2f} s')
@@ -0,0 +1,158 @@
+import abc
+import hashlib
+import os
+import shutil
+import subprocess
+import wave
+
+
+CACHE = os.path.expanduser('~/.cache/fitness/speech')
+RATE = 22050       # Hz, 16-bit mono for every backend so clips concatenate
+GAP_S = 0.15       # silence between concatenated clips
+PLAYERS = [['afplay'], ['aplay', '-q'], ['paplay']]
+
+
+class Backend(abc.ABC):
+    '''Turns text into a WAV file, and plays WAV files'''
+    name = None
+
+    @abc.abstractmethod
+    def synthesize(self, text: str, voice: str, path: str):
+        '''Write <text> said in <voice> to <path> as a WAV file'''
+
+    def play(self, path: str):
+        for player in PLAYERS:
+            if shutil.which(player[0]):
+                subprocess.run(player + [path], check=False)
+                return
+        print(f'No audio player found for {path}')
+
+
+class SayBackend(Backend):
+    '''macOS `say`'''
+    name = 'say'
+
+    def synthesize(self, text, voice, path):
+        subprocess.run(
+            ['say', '-v', voice, '-o', path, '--file-format=WAVE',
+             f'--data-format=LEI16@{RATE}', text],
+            check=True)
+
+
+class EspeakBackend(Backend):
+    '''espeak / espeak-ng, for Linux'''
+    name = 'espeak'
+
+    def __init__(self):
+        self.cmd = shutil.which('espeak-ng') or shutil.which('espeak')
+
+    def synthesize(self, text, voice, path):
+        # espeak has its own voices; macOS voice names are ignored
+        subprocess.run([self.cmd, '-w', path, text], check=True)
+
+
+class SilentBackend(Backend):
+    '''Writes silent clips about as long as the text would take to say, and
+    plays nothing. Runs anywhere, e.g. for testing on a headless box.
+    '''
+    name = 'silent'
+    CHARS_PER_S = 15
+
+    def synthesize(self, text, voice, path):
+        n_frames = int(RATE * len(text) / self.CHARS_PER_S)
+        _write_silence(path, n_frames)
+
+    def play(self, path):
+        pass
+
+
+BACKENDS = {b.name: b for b in [SayBackend, EspeakBackend, SilentBackend]}
+
+
+def get_backend(name: str = None):
+    '''Backend by name, or the first available of say, espeak and silent'''
+    if name is None:
+        if shutil.which('say'):
+            name = 'say'
+        elif shutil.which('espeak-ng') or shutil.which('espeak'):
+            name = 'espeak'
+        else:
+            name = 'silent'
+    return BACKENDS[name]()
+
+
+class Speaker:
+    def __init__(
+            self,
+            voice: str,
+            backend: Backend = None,
+            cache_dir: str = CACHE):
+        '''Says things by playing pre-rendered clips: each distinct phrase is
+        synthesized once (per backend and voice) and cached on disk
+        Args:
+        - voice: default voice
+        - backend: see get_backend (defaults to the first available)
+        '''
+        self.voice = voice
+        self.backend = get_backend() if backend is None else backend
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def clip(self, text: str, voice: str = None):
+        '''Path to the cached clip for <text>, synthesizing it if needed'''
+        voice = voice or self.voice
+        path = self._path(self.backend.name, voice, text)
+        if not os.path.exists(path):
+            tmp = f'{path}.tmp.wav'
+            self.backend.synthesize(text, voice, tmp)
+            os.replace(tmp, path)
+        return path
+
+    def prerender(self, phrases: list[str], voice: str = None):
+        '''Synthesize <phrases> ahead of time (e.g. every move name)'''
+        for text in phrases:
+            self.clip(text, voice)
+
+    def say(self, text: str, voice: str = None):
+        self.backend.play(self.clip(text, voice))
+
+    def say_sequence(self, phrases: list[str], voice: str = None):
+        '''Say <phrases> (e.g. the moves of a combo) as one clip joined from
+        the cached clip for each phrase
+        '''
+        if len(phrases) == 1:
+            return self.say(phrases[0], voice)
+        voice = voice or self.voice
+        path = self._path(self.backend.name, voice, *phrases)
+        if not os.path.exists(path):
+            clips = [self.clip(text, voice) for text in phrases]
+            _concatenate(clips, path)
+        self.backend.play(path)
+
+    def _path(self, *parts):
+        key = hashlib.sha1('\x1f'.join(parts).encode()).hexdigest()
+        return f'{self.cache_dir}/{key}.wav'
+
+
+def _write_silence(path, n_frames):
+    with wave.open(path, 'wb') as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(RATE)
+        out.writeframes(b'\x00\x00' * n_frames)
+
+
+def _concatenate(clips, path):
+    tmp = f'{path}.tmp.wav'
+    with wave.open(tmp, 'wb') as out:
+        for i, clip in enumerate(clips):
+            with wave.open(clip, 'rb') as src:
+                if i == 0:
+                    out.setparams(src.getparams())
+                    gap = b'\x00' * (
+                        int(GAP_S * src.getframerate())
+                        * src.getsampwidth() * src.getnchannels())
+                else:
+                    out.writeframes(gap)
+                out.writeframes(src.readframes(src.getnframes()))
+    os.replace(tmp, path)
@@ -0,0 +1,110 @@
+import json
+import time
+
+from common.db import DATA, connect
+from common.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+DB = f'{DATA}/telemetry.sqlite'
+PERCENTILES = [50, 90, 99, 100]
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    program TEXT NOT NULL,
+    started_at REAL NOT NULL,  -- unix time
+    planned_s REAL NOT NULL,
+    elapsed_s REAL NOT NULL,
+    meta TEXT                  -- JSON, e.g. the workout's options
+);
+CREATE TABLE IF NOT EXISTS cues (
+    session_id INTEGER NOT NULL REFERENCES sessions(id),
+    at REAL NOT NULL,          -- planned start (s from session start)
+    started REAL NOT NULL,     -- actual start
+    finished REAL NOT NULL,    -- when its action (speech, image) returned
+    channel TEXT NOT NULL,
+    label TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cues_session ON cues(session_id);
+CREATE INDEX IF NOT EXISTS sessions_program ON sessions(program, started_at);
+'''
+
+
+class TelemetryLog:
+    def __init__(self, path: str = DB):
+        '''Append-only log of how sessions actually ran: every cue's planned
+        start, actual start and how long its action took (for the speech
+        channel, the speech latency; for the image channel, the image
+        latency). Sessions already time their cues in memory, so recording
+        is one insert after the session, not work inside the loop.
+        '''
+        self.path = path
+
+    def _connect(self):
+        return connect(self.path, SCHEMA)
+
+    def record(self, program: str, session, meta: dict = None):
+        '''Append a finished <session> (see common.session); returns its id'''
+        with self._connect() as db:
+            session_id = db.execute(
+                'INSERT INTO sessions '
+                '(program, started_at, planned_s, elapsed_s, meta) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (program,
+                 time.time() - session.elapsed,
+                 session.planned_time,
+                 session.elapsed,
+                 json.dumps(meta))).lastrowid
+            db.executemany(
+                'INSERT INTO cues VALUES (?, ?, ?, ?, ?, ?)',
+                [(session_id, cue.at, cue.started, cue.finished, cue.channel,
+                  cue.label)
+                 for cue in session.cues if cue.started is not None])
+        return session_id
+
+    def summary(self, program: str = None, last: int = None):
+        '''Drift (actual - planned start) and action duration percentiles
+        per channel, over the <last> sessions (default all) of <program>
+        (default every program)
+        Returns:
+        - n_sessions, and {channel: {'n': n cues, 'drift': [percentiles],
+          'duration': [percentiles]}} (see PERCENTILES)
+        '''
+        where = '' if program is None else 'WHERE program = ?'
+        params = [] if program is None else [program]
+        limit = '' if last is None else f'LIMIT {int(last)}'
+        with self._connect() as db:
+            ids = [
+                row[0] for row in db.execute(
+                    f'SELECT id FROM sessions {where} '
+                    f'ORDER BY started_at DESC {limit}',
+                    params)]
+            rows = db.execute(
+                'SELECT channel, started - at, finished - started FROM cues '
+                f'WHERE session_id IN ({",".join("?" * len(ids))})',
+                ids).fetchall()
+        channels = {}
+        for channel, drift, duration in rows:
+            drifts, durations = channels.setdefault(channel, ([], []))
+            drifts.append(drift)
+            durations.append(duration)
+        return len(ids), {
+            channel: {
+                'n': len(drifts),
+                'drift': np.percentile(drifts, PERCENTILES).tolist(),
+                'duration': np.percentile(durations, PERCENTILES).tolist()}
+            for channel, (drifts, durations) in channels.items()}
+
+
+def print_summary(program: str = None, last: int = None, path: str = DB):
+    n_sessions, channels = TelemetryLog(path).summary(program, last)
+    print(f'{n_sessions} session(s) of {program or "every program"}')
+    if not channels:
+        return
+    header = ' '.join(f'{f"p{p}":>7s}' for p in PERCENTILES)
+    print(f'{"channel":8s} {"":9s} {"cues":>6s} {header}')
+    for channel, stats in sorted(channels.items()):
+        for name in ['drift', 'duration']:
+            values = ' '.join(f'{v:7.3f}' for v in stats[name])
+            print(f'{channel:8s} {name:9s} {stats["n"]:6d} {values}')
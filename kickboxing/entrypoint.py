@@ -3,24 +3,43 @@
 #------------------------------------------------------------------------------
 #
 # Usage:
-#   ./main [-c CATEGORY] [-t TIME] [-w WORK] [-r REST]
+#   ./main [-c CATEGORY] [-t TIME] [-w WORK] [-r REST] [-s SPEECH]
+#          [--seed SEED] [--save-plan PATH] [--plan PATH] [--plan-only]
+#          [--simulate] [--no-history] [--combo-stats N]
 #
 #   Where
 #   - CATEGORY in [ b | kb | bc | kbc ] (b: boxing, kb: kickboxing, c: circuit)
 #   - TIME: total time (min)
 #   - WORK: exercise time per round (min)
 #   - REST: rest time per round (min)
+#   - SPEECH in [ say | espeak | silent ]: speech backend (defaults to the
+#     first available)
+#   - SEED: random seed, to make the same workout again
+#   - --save-plan PATH: save the generated workout (.json or .npz)
+#   - --plan PATH: play a saved workout instead of generating one
+#   - --plan-only: generate (and save) the workout without playing it
+#   - --simulate: fast-forward through the workout, printing every cue with
+#     its time, without speaking or waiting
+#   - --no-history: neither bias moves by the workout history nor add this
+#     workout to it (see common/history.py)
+#   - --combo-stats N: print how often each move, combo length and repeated
+#     move comes up over N combos of each round type, without a workout
 #
 #------------------------------------------------------------------------------
 
 # TODO: make circuit-only option
 import argparse
+from functools import cache
 from math import ceil
 import os
 import sys
-from time import sleep, time
 
-from numpy import random
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.lazy import lazy_import
+from common.sampling import MarkovSampler, WeightedSampler
+from plan import Plan
+
+np = lazy_import('numpy')
 
 
 # Moves and weights (frequency in workout is proportional to weight)
@@ -46,6 +65,33 @@ KICKBOXING_MOVES = {
     'heel kick': 0.3,
     'inside crescent': 0.25,
     'outside crescent': 0.1}
+DEFENSIVE_MOVES = [
+    'bob', 'weave', 'circle left', 'circle right', 'block left',
+    'block right']
+# How much more (> 1) or less (< 1) likely two moves are to follow each other
+# in a combo, either way round, than their weights alone make them; 1 if not
+# listed. The weights stay each move's overall frequency (see MarkovSampler).
+COMBO_AFFINITY = {
+    ('jab', 'cross'): 3,
+    ('cross', 'cross'): 0.2,
+    ('cross', 'left hook'): 2,
+    ('left hook', 'right uppercut'): 2,
+    ('right hook', 'left uppercut'): 2,
+    ('left hook', 'left hook'): 0.2,
+    ('right hook', 'right hook'): 0.2,
+    ('left uppercut', 'left uppercut'): 0.2,
+    ('right uppercut', 'right uppercut'): 0.2,
+    ('jab', 'front kick'): 2,
+    ('jab', 'side kick'): 2,
+    ('cross', 'roundhouse'): 2,
+    ('elbow', 'knee'): 2,
+    ('roundhouse', 'roundhouse'): 0.3,
+    # Defensive moves seldom follow one another, and never the same one
+    # twice in a row
+    **{(a, b): 0 if a == b else 0.3
+       for a in DEFENSIVE_MOVES for b in DEFENSIVE_MOVES}}
+# Weights of the moves that open combos more (or less) often than others
+COMBO_START = {'jab': 15}
 EXERCISES = {
     'pushups': 5,
     'pike pushups': 3,
@@ -83,11 +129,88 @@ TEST = False
 DEFAULTS = defaults['test'] if TEST else defaults['actual']
 
 
+@cache
+def default_samplers():
+    '''Built once, when first needed; move weights are never modified while
+    sampling
+    '''
+    return make_samplers(BOXING_MOVES, KICKBOXING_MOVES, EXERCISES)
+
+
+def make_samplers(boxing_moves, kickboxing_moves, exercises):
+    '''Combos are Markov chains over the moves (see COMBO_AFFINITY), with the
+    move weights as their stationary distribution
+    '''
+    return {
+        'box': MarkovSampler.from_dict(
+            boxing_moves, COMBO_AFFINITY, COMBO_START),
+        'kickbox': MarkovSampler.from_dict(
+            {**boxing_moves, **kickboxing_moves}, COMBO_AFFINITY,
+            COMBO_START),
+        'other': WeightedSampler.from_dict(exercises)}
+
+
+def balanced_samplers(history):
+    '''Samplers whose weights are nudged toward the moves and exercises done
+    less than their share so far (see History.balance)
+    '''
+    return make_samplers(*(
+        history.balance('kickboxing', weights)
+        for weights in [BOXING_MOVES, KICKBOXING_MOVES, EXERCISES]))
+
+
 def main(args):
     args = parse_args(args)
-    workout = Workout(**args)
-    print(workout)
-    workout.start()
+    speech = args.pop('speech')
+    plan_path = args.pop('plan')
+    save_path = args.pop('save_plan')
+    plan_only = args.pop('plan_only')
+    simulate = args.pop('simulate')
+    if args.pop('no_history'):
+        history = None
+    else:
+        from common.history import History
+        history = History()
+    n_combos = args.pop('combo_stats')
+    if n_combos is not None:
+        samplers = None if history is None else balanced_samplers(history)
+        for cat in ['box', 'kickbox']:
+            print_combo_stats(
+                cat, *combo_stats(n_combos, cat, samplers, args['seed']))
+        return
+    if plan_path is not None:
+        plan = Plan.load(plan_path)
+        print('Loaded plan:', plan.meta)
+    else:
+        if history is not None:
+            args['samplers'] = balanced_samplers(history)
+        workout = Workout(**args)
+        print(workout)
+        print('Rounds:', workout.rounds)
+        plan = workout.compile()
+    if save_path is not None:
+        plan.save(save_path)
+    if plan_only:
+        print(plan)
+        return
+    # Only needed to play a workout, and slow to import (e.g. for --help)
+    from common.session import print_cue
+    if simulate:
+        session = plan.session(sink=print_cue)
+        session.simulate()
+        print(f'Simulated {session.elapsed:.0f} s workout')
+        return
+    from common.speech import Speaker, get_backend
+    from common.telemetry import TelemetryLog
+    speaker = Speaker(VOICE, get_backend(speech))
+    # Render every phrase up front so nothing is synthesized mid-round
+    speaker.prerender(plan.phrases())
+    session = plan.session(speaker, sink=print_cue)
+    session.run()
+    session.report()
+    TelemetryLog().record('kickboxing', session, plan.meta)
+    if history is not None:
+        history.record('kickboxing', plan.counts())
 
     
 def parse_args(args):
@@ -111,14 +234,78 @@ def parse_args(args):
         help='rest time per round (min)',
         type=float,
         default=DEFAULTS['r'])
+    parser.add_argument(
+        '-s', '--speech',
+        help='speech backend (say, espeak, silent)',
+        default=None)
+    parser.add_argument(
+        '--seed', help='random seed', type=int, default=None)
+    parser.add_argument(
+        '--save-plan', help='save the workout to (.json or .npz)')
+    parser.add_argument('--plan', help='play a saved workout')
+    parser.add_argument(
+        '--plan-only',
+        help='generate the workout without playing it',
+        action='store_true')
+    parser.add_argument(
+        '--simulate',
+        help='fast-forward through the workout without playing it',
+        action='store_true')
+    parser.add_argument(
+        '--no-history',
+        help='do not bias by or add to the workout history',
+        action='store_true')
+    parser.add_argument(
+        '--combo-stats',
+        help='print move and combo statistics over this many combos',
+        type=int,
+        metavar='N')
     args = parser.parse_args()
+    if args.speech is not None:
+        from common.speech import BACKENDS
+        if args.speech not in BACKENDS:
+            parser.error(
+                f'argument -s/--speech: invalid choice: {args.speech!r} '
+                f'(choose from {", ".join(BACKENDS)})')
     return vars(args)
 
 
-def say(text):
-    os.system(f'say -v {VOICE} {text}')
+def combo_stats(n, cat='kickbox', samplers=None, seed=None):
+    '''How <n> combos of round type <cat> come out, drawn all at once
+    Returns:
+    - {move: fraction of all moves}
+    - {combo length: fraction of combos}
+    - fraction of moves (after the first of a combo) that repeat the move
+      before
+    '''
+    sampler = (samplers or default_samplers())[cat]
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, MAX_COMBO + 1, size=n)
+    moves = sampler.walk(rng, lengths)
+    firsts = np.zeros(len(moves), dtype=bool)
+    firsts[np.cumsum(lengths) - lengths] = True
+    repeats = (moves[1:] == moves[:-1])[~firsts[1:]]
+    move_freq = np.bincount(moves, minlength=len(sampler)) / len(moves)
+    length_freq = np.bincount(lengths, minlength=MAX_COMBO + 1)[1:] / n
+    return (
+        dict(zip(sampler.items.tolist(), move_freq.tolist())),
+        dict(enumerate(length_freq.tolist(), 1)),
+        float(repeats.mean()) if len(repeats) else 0.)
+
+
+def print_combo_stats(cat, moves, lengths, repeats):
+    weights = BOXING_MOVES if cat == 'box' else {
+        **BOXING_MOVES, **KICKBOXING_MOVES}
+    total = sum(weights.values())
+    print(f'{cat}:')
+    print(f'  {"move":20s} {"share":>6s} {"weight":>6s}')
+    for move, share in sorted(moves.items(), key=lambda m: -m[1]):
+        print(f'  {move:20s} {share:6.3f} {weights[move] / total:6.3f}')
+    print('  combo lengths: ' + ', '.join(
+        f'{length}: {share:.3f}' for length, share in lengths.items()))
+    print(f'  repeated moves: {repeats:.3f}')
+
 
-    
 class Workout:
     '''Categories:
     - b:   Boxing only        (box, break, box, break...)
@@ -127,7 +314,14 @@ class Workout:
     - kbc: Kickboxing circuit (kb, break, other, break...)
     - c:   Circuit only       (other, break, other, break...)
     '''
-    def __init__(self, category, time, work, rest):
+    def __init__(
+            self, category, time, work, rest, seed=None, samplers=None):
+        '''
+        Args:
+        - samplers: see make_samplers (defaults to the fixed weights)
+        '''
+        self.seed = seed
+        self.samplers = samplers
         self.cat = category
         self.total_t = time
         self.work_t = work
@@ -163,69 +357,76 @@ class Workout:
         rounds = rounds[:self.n_rounds]
         return rounds
 
-    def start(self):
+    def compile(self):
+        '''Generate the whole workout (every round, combo, exercise and rest
+        cue) as a Plan, drawing from one seeded generator
+        '''
+        rng = np.random.default_rng(self.seed)
         rest_s = int(round(self.rest_t * 60))
-        print('Rounds:', self.rounds)
+        rest_cue = f'Rest for the next {rest_s} seconds'
+        cues = []
+        offset = 0
         for rnd in self.rounds:
-            r = Round(rnd, self.work_t)
-            r.start()
-            say(f'Rest for the next {rest_s} seconds')
-            sleep(rest_s)
+            r = Round(rnd, self.work_t, self.samplers)
+            cues += r.compile(rng, offset)
+            offset += r.t
+            cues.append((offset, 'rest', [rest_cue]))
+            offset += rest_s
+        meta = {
+            'category': self.cat,
+            'time': self.total_t,
+            'work': self.work_t,
+            'rest': self.rest_t,
+            'seed': self.seed,
+            'balanced': self.samplers is not None,
+            'rounds': self.rounds}
+        return Plan(cues, meta)
 
 
 class Round:
-    def __init__(self, cat, t):
+    def __init__(self, cat, t, samplers=None):
         self.cat = cat
         self.t = int(round(t * 60))
+        self.samplers = samplers or default_samplers()
+
+    def compile(self, rng, start):
+        '''Cues for this round, starting <start> s into the workout'''
+        return {
+            'box': self._compile_kboxing,
+            'kickbox': self._compile_kboxing,
+            'other': self._compile_other
+        }[self.cat](rng, start)
+
+    def _compile_kboxing(self, rng, start):
+        # Enough combos to fill the round even if every combo is one move; a
+        # combo takes a move time per move, plus one to reset
+        max_combos = ceil(self.t / (2*MOVE_TIME)) + 1
+        lengths = rng.integers(1, MAX_COMBO + 1, size=max_combos)
+        starts = start + np.concatenate(
+            [[0], np.cumsum(MOVE_TIME * (lengths + 1))[:-1]])
+        n = np.searchsorted(starts, start + self.t)
+        lengths, starts = lengths[:n], starts[:n]
+        moves = self.samplers[self.cat].sample(rng, lengths).tolist()
+        # Slicing one list is much faster than np.split for a few dozen
+        # combos
+        ends = np.cumsum(lengths).tolist()
+        return [
+            (at, 'combo', moves[end - length:end])
+            for at, end, length in zip(
+                starts.astype(float).tolist(), ends, lengths.tolist())]
 
-    def start(self):
-        {
-            'box': self._start_kboxing,
-            'kickbox': self._start_kboxing,
-            'other': self._start_other
-        }[self.cat](self.cat)
-
-    def _start_kboxing(self, cat):
-        moves = BOXING_MOVES
-        if cat == 'kickbox':
-            moves.update(KICKBOXING_MOVES)
-        moves = self._normalize(moves)
-        start_time = time()
-        elapsed_time = 0
-        while elapsed_time < self.t:
-            combo = self._get_combo(moves)
-            say(combo)
-            sleep(MOVE_TIME)
-            elapsed_time = time() - start_time
-
-    @staticmethod
-    def _get_combo(moves):
-        n = random.randint(low=1,high=MAX_COMBO + 1)
-        moves = random.choice(
-            list(moves.keys()), size=n, replace=True, p=list(moves.values()))
-        return ', '.join(moves)
-
-    def _start_other(self, _):
-        moves = self._normalize(EXERCISES.copy())
+    def _compile_other(self, rng, start):
+        sampler = self.samplers['other']
         n_moves = ceil(self.t / MAX_S_PER_EXERCISE)
         time_per_move = self.t / n_moves
-        for _ in range(n_moves):
-            if not moves:
-                moves = self._normalize(EXERCISES.copy())
-            move = random.choice(list(moves.keys()), p=list(moves.values()))
-            moves.pop(move)
-            moves = self._normalize(moves)
-            say(move)
-            print(move)
-            sleep(time_per_move)
-
-    @staticmethod
-    def _normalize(dct):
-        # Normalize <dct> values to sum to 1
-        total = sum(dct.values())
-        for k, v in dct.items():
-            dct[k] = v / total
-        return dct
+        # Weighted, without replacement until every exercise has been done
+        picks = []
+        while len(picks) < n_moves:
+            k = min(n_moves - len(picks), len(sampler))
+            picks += sampler.sample(rng, k).tolist()
+        return [
+            (start + i*time_per_move, 'exercise', [move])
+            for i, move in enumerate(picks)]
 
 
 if __name__ == '__main__':
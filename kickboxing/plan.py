@@ -0,0 +1,115 @@
+import json
+from functools import partial
+
+from common.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+KINDS = ['combo', 'exercise', 'rest']
+
+
+class Plan:
+    def __init__(self, cues: list[tuple], meta: dict):
+        '''A whole workout, generated up front
+        Args:
+        - cues: (at (s from start), kind (see KINDS), [phrases]) in time
+          order; a combo's phrases are its moves
+        - meta: how the plan was made (category, times, seed, ...)
+        '''
+        self.cues = cues
+        self.meta = meta
+
+    def __str__(self):
+        return '\n'.join(
+            f'{at:7.1f}  {kind:8s}  {", ".join(phrases)}'
+            for at, kind, phrases in self.cues)
+
+    def phrases(self):
+        '''Every distinct phrase said in the workout'''
+        return sorted({p for _, _, phrases in self.cues for p in phrases})
+
+    def counts(self):
+        '''{move or exercise: times done}'''
+        counts = {}
+        for _, kind, phrases in self.cues:
+            if kind != 'rest':
+                for phrase in phrases:
+                    counts[phrase] = counts.get(phrase, 0) + 1
+        return counts
+
+    def session(self, speaker=None, clock=None, sink=None):
+        '''The plan as a Session (see common.session); <speaker> is only
+        needed if the session is run rather than simulated
+        '''
+        from common.session import Session
+        session = Session(clock, sink)
+        for at, kind, phrases in self.cues:
+            session.add(
+                at, ', '.join(phrases), partial(_play, speaker, kind, phrases))
+        return session
+
+    def save(self, path: str):
+        '''Save as .json, or as compact binary .npz'''
+        if path.endswith('.npz'):
+            self._save_npz(path)
+        else:
+            with open(path, 'w') as f:
+                json.dump(self.to_dict(), f)
+        print('Saved plan to', path)
+
+    def to_dict(self):
+        '''The plan as JSON-able data (as saved to .json)'''
+        return {
+            'meta': self.meta,
+            'cues': [
+                {'at': at, 'kind': kind, 'phrases': phrases}
+                for at, kind, phrases in self.cues]}
+
+    @classmethod
+    def load(cls, path: str):
+        if path.endswith('.npz'):
+            return cls._load_npz(path)
+        with open(path, 'r') as f:
+            plan = json.load(f)
+        cues = [(c['at'], c['kind'], c['phrases']) for c in plan['cues']]
+        return cls(cues, plan['meta'])
+
+    def _save_npz(self, path):
+        # Phrases are stored once, as a vocabulary, and cues refer to them
+        # by index
+        vocab = self.phrases()
+        code = {p: i for i, p in enumerate(vocab)}
+        np.savez_compressed(
+            path,
+            at=np.array([at for at, _, _ in self.cues], dtype=float),
+            kind=np.array(
+                [KINDS.index(kind) for _, kind, _ in self.cues],
+                dtype=np.uint8),
+            n_phrases=np.array(
+                [len(phrases) for _, _, phrases in self.cues],
+                dtype=np.uint8),
+            phrases=np.array(
+                [code[p] for _, _, phrases in self.cues for p in phrases],
+                dtype=np.uint16),
+            vocab=np.array(vocab, dtype=str),
+            meta=np.array(json.dumps(self.meta)))
+
+    @classmethod
+    def _load_npz(cls, path):
+        with np.load(path) as data:
+            vocab = data['vocab'].tolist()
+            phrases = np.split(
+                data['phrases'], np.cumsum(data['n_phrases'])[:-1])
+            cues = [
+                (float(at), KINDS[kind], [vocab[i] for i in codes])
+                for at, kind, codes in zip(data['at'], data['kind'], phrases)]
+            meta = json.loads(str(data['meta']))
+        return cls(cues, meta)
+
+
+def _play(speaker, kind, phrases):
+    if kind == 'combo':
+        speaker.say_sequence(phrases)
+    else:
+        speaker.say(phrases[0])
@@ -0,0 +1,82 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import perf_counter
+
+from app.cycle import make_cycle
+from app.input_handling import InputReader
+from app.storage import save_table
+
+
+def _make_athlete_cycle(athlete, source, outpath, cycle_kwargs):
+    # Runs in a worker process; <source> is a path or the athlete's rows
+    start = perf_counter()
+    reader = InputReader()
+    if isinstance(source, str):
+        exercises = reader.get_exercises(source)
+    else:
+        exercises = reader.parse(source)
+    schedule = make_cycle(exercises, **cycle_kwargs)
+    save_table(schedule, outpath)
+    return athlete, outpath, len(schedule), perf_counter() - start
+
+
+class BatchRunner:
+    def __init__(
+            self,
+            outdir: str,
+            n_workers: int = None,
+            fmt: str = 'csv',
+            **cycle_kwargs):
+        '''Makes cycles for a whole roster in parallel
+        Args:
+        - outdir: directory to write one <athlete>_schedule.<fmt> per athlete
+        - n_workers: number of worker processes (defaults to CPU count)
+        - fmt: output format (see app.formats.FORMATS)
+        - cycle_kwargs: passed on to app.cycle.make_cycle
+        '''
+        self.outdir = outdir
+        self.n_workers = n_workers
+        self.fmt = fmt
+        self.cycle_kwargs = cycle_kwargs
+
+    def run(self, path: str, key: str = 'athlete'):
+        '''<path> is either a directory of input files (one per athlete,
+        named <athlete>.csv) or a single roster file with a <key> column
+        '''
+        if os.path.isdir(path):
+            jobs = [
+                (f.removesuffix('.csv'), f'{path}/{f}')
+                for f in sorted(os.listdir(path)) if f.endswith('.csv')]
+        else:
+            # Validate the whole roster up front, so every bad row is
+            # reported before any work starts
+            roster = InputReader().read(path)
+            jobs = [
+                (str(athlete), rows.drop(columns=key))
+                for athlete, rows in roster.groupby(key, sort=False)]
+        return self._run(jobs)
+
+    def _run(self, jobs):
+        os.makedirs(self.outdir, exist_ok=True)
+        print(f'Making cycles for {len(jobs)} athletes...')
+        start = perf_counter()
+        results = []
+        with ProcessPoolExecutor(self.n_workers) as pool:
+            futures = [
+                pool.submit(
+                    _make_athlete_cycle,
+                    athlete,
+                    source,
+                    f'{self.outdir}/{athlete}_schedule.{self.fmt}',
+                    self.cycle_kwargs)
+                for athlete, source in jobs]
+            # Report each athlete as soon as their schedule is written
+            for future in as_completed(futures):
+                athlete, outpath, _, elapsed = future.result()
+                results.append((athlete, elapsed))
+                print(f'  {athlete:20s} {elapsed*1000:8.1f} ms -> {outpath}')
+        total = perf_counter() - start
+        print(
+            f'Made {len(results)} cycles in {total:.2f} s '
+            f'({len(results) / total:.1f} athletes/s)')
+        return results
@@ -0,0 +1,44 @@
+from functools import cache
+
+from app.scheduler import Scheduler
+from app.solver_cache import SolverCache
+from app.templates import load_templates
+from app.weight_index import PlateAnnotator
+
+
+@cache
+def _annotator():
+    # Built once per process: the plate index only depends on the inventory
+    return PlateAnnotator.from_inventory(cache=SolverCache())
+
+
+def make_cycle(
+        exercises: list[dict],
+        is_extended: bool = True,
+        do_plates: bool = False,
+        templates_path: str = None,
+        n_cycles: int = 1,
+        with_cycle: bool = False,
+        min_changes: bool = False):
+    '''Schedule for one cycle of <exercises> (as from InputReader)
+    Args:
+    - is_extended: see Scheduler
+    - do_plates: if True, snap weights to loadable ones and add plates
+    - templates_path: optional JSON file of program templates
+    - n_cycles: if > 1, project this many cycles (each incremented from the
+      last) into one schedule with a leading Cycle column
+    - with_cycle: if True, include the Cycle column even for one cycle
+    - min_changes: with <do_plates>, load each lift's sets so as to move
+      the fewest plates between them (see app.plate_sequence)
+    '''
+    templates = (
+        None if templates_path is None else load_templates(templates_path))
+    scheduler = Scheduler(
+        exercises, is_extended=is_extended, templates=templates)
+    if n_cycles > 1 or with_cycle:
+        schedule = scheduler.project(n_cycles)
+    else:
+        schedule = scheduler.make_schedule()
+    if do_plates:
+        schedule = _annotator().annotate(schedule, min_changes)
+    return schedule
@@ -0,0 +1,13 @@
+import os
+
+
+# Parquet and Feather need pyarrow; .npz only needs NumPy. Kept apart from
+# app.storage so the command line can list them without importing pandas.
+FORMATS = ['csv', 'parquet', 'feather', 'npz']
+
+
+def get_format(path: str):
+    fmt = os.path.splitext(path)[1].lstrip('.')
+    if fmt not in FORMATS:
+        raise ValueError(f'Unsupported format "{fmt}" (use one of {FORMATS})')
+    return fmt
@@ -0,0 +1,112 @@
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+from app.cycle import make_cycle
+from app.input_handling import TYPES
+from app.weight_chart import DATA as WEIGHTS
+
+
+CACHE = './data/.cache/schedules'
+SCHEDULE_VERSION = 1  # bump when Scheduler output changes
+INVENTORY = [f'{WEIGHTS}/{bell}_weights.csv' for bell in ['bar', 'dumb']]
+INCREMENT = ('Increment for Next Cycle', '')
+
+
+class ScheduleCache:
+    def __init__(self, cache_dir: str = CACHE):
+        '''Keeps the rows of the last schedule made under each name, keyed by
+        a hash of the input row they came from, so that remaking a schedule
+        only rebuilds the exercises whose input rows changed
+        '''
+        self.cache_dir = cache_dir
+
+    def make_cycle(
+            self,
+            name: str,
+            exercises: list[dict],
+            is_extended: bool = True,
+            do_plates: bool = False,
+            templates_path: str = None,
+            n_cycles: int = 1,
+            min_changes: bool = False):
+        '''Same schedule as app.cycle.make_cycle, with unchanged exercises
+        spliced in from the last schedule made as <name> (e.g. the output
+        file name). Changing the templates, inventory or options rebuilds
+        everything.
+        '''
+        settings = _settings_key(
+            is_extended, do_plates, templates_path, n_cycles, min_changes)
+        path = f'{self.cache_dir}/{name}.pickle'
+        blocks = {}
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                cached = pickle.load(f)
+            if cached['settings'] == settings:
+                blocks = cached['blocks']
+        records = [
+            (day, kind, record)
+            for day, day_exercises in enumerate(exercises)
+            for kind in TYPES
+            for record in day_exercises[kind]]
+        keys = [_record_key(*record) for record in records]
+        missing = [i for i, key in enumerate(keys) if key not in blocks]
+        if missing:
+            # Same days, only the missing exercises, so Day numbers match
+            partial = [{kind: [] for kind in TYPES} for _ in exercises]
+            for i in missing:
+                day, kind, record = records[i]
+                partial[day][kind].append(record)
+            built = make_cycle(
+                partial, is_extended, do_plates, templates_path, n_cycles,
+                with_cycle=True, min_changes=min_changes)
+            blocks.update(_split(built, [keys[i] for i in missing]))
+        print(f'Rebuilt {len(missing)} of {len(keys)} exercises')
+        # Rows are in cycle order, then exercise order within each cycle
+        schedule = pd.concat([blocks[key] for key in keys])
+        schedule = schedule.sort_values(
+            ('Cycle', ''), kind='stable').reset_index(drop=True)
+        self._save(path, settings, {key: blocks[key] for key in keys})
+        if n_cycles == 1:
+            schedule = schedule.drop(columns='Cycle', level=0)
+        return schedule
+
+    def _save(self, path, settings, blocks):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(
+                {'settings': settings, 'blocks': blocks}, f,
+                pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+
+def _record_key(day, kind, record):
+    name, training_max, increment = record
+    content = (
+        f'{day}|{kind}|{name}|{float(training_max)!r}|{float(increment)!r}')
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def _settings_key(
+        is_extended, do_plates, templates_path, n_cycles, min_changes):
+    h = hashlib.sha256(
+        f'v{SCHEDULE_VERSION}|{is_extended}|{do_plates}|{n_cycles}|'
+        f'{min_changes}'.encode())
+    files = ([] if templates_path is None else [templates_path]) + (
+        INVENTORY if do_plates else [])
+    for path in files:
+        with open(path, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()[:16]
+
+
+def _split(schedule, keys):
+    # Each exercise's first row in a cycle is the only one with an increment
+    block = schedule[INCREMENT].notna().to_numpy().cumsum() - 1
+    block %= len(keys)
+    return {
+        key: schedule[block == i].reset_index(drop=True)
+        for i, key in enumerate(keys)}
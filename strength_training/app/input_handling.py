@@ -1,26 +1,92 @@
+import numpy as np
 import pandas as pd
 
 
+COLUMNS = ['day', 'type', 'exercise', 'training_max', 'increment_per_cycle']
+NUMERIC = ['day', 'training_max', 'increment_per_cycle']
+TYPES = ['main', 'support']
+
+
+class InputError(ValueError):
+    def __init__(self, errors: list[str]):
+        '''Raised with every problem found in an input file at once'''
+        self.errors = errors
+        super().__init__(
+            f'{len(errors)} invalid input row(s):\n  ' + '\n  '.join(errors))
+
+
 class InputReader:
+    def __init__(self, chunksize: int = None):
+        '''
+        Args:
+        - chunksize: if given, read files this many rows at a time (for very
+          large roster files)
+        '''
+        self.chunksize = chunksize
+
     def get_exercises(self, path):
-        df = pd.read_csv(path)
-        exercises = []
-        for day in df['day'].unique():
-            day_exercises = self._get_exercises_for_day(
-                df.loc[df.day == day, :])
-            exercises.append(day_exercises)
+        return self.parse(self.read(path))
+
+    def read(self, path):
+        '''Read and validate an input file; extra columns (e.g. "athlete")
+        are kept
+        '''
+        read_kwargs = {'dtype': {'type': 'string', 'exercise': 'string'}}
+        if self.chunksize is None:
+            return self._validate(pd.read_csv(path, **read_kwargs))
+        chunks = pd.read_csv(path, chunksize=self.chunksize, **read_kwargs)
+        errors = []
+        valid = []
+        for chunk in chunks:
+            try:
+                valid.append(self._validate(chunk))
+            except InputError as e:
+                errors += e.errors
+        if errors:
+            raise InputError(errors)
+        return pd.concat(valid)
+
+    def parse(self, df):
+        '''Day -> main/support exercises, days in order of first appearance:
+        [{'main': [(exercise, training_max, increment), ...],
+          'support': [...]}, ...]
+        <df> must come from read() (or be rows of it), which has already
+        validated and converted it
+        '''
+        codes, days = pd.factorize(df['day'])
+        order = np.argsort(codes, kind='stable')
+        exercises = [{kind: [] for kind in TYPES} for _ in days]
+        columns = [
+            codes[order],
+            df['type'].to_numpy()[order],
+            df['exercise'].to_numpy()[order],
+            df['training_max'].to_numpy()[order].tolist(),
+            df['increment_per_cycle'].to_numpy()[order].tolist()]
+        for day, kind, name, tr_mx, incr in zip(*columns):
+            exercises[day][kind].append((name, tr_mx, incr))
         return exercises
 
     @staticmethod
-    def _get_exercises_for_day(day_df):
-        main = []
-        support = []
-        for _, row in day_df.iterrows():
-            tup = (row.exercise, row.training_max, row.increment_per_cycle)
-            if row['type'] == 'main':
-                main.append(tup)
-            elif row['type'] == 'support':
-                support.append(tup)
-            else:
-                raise ValueError(f'Bad "type": {row["type"]}')
-        return {'main': main, 'support': support}
+    def _validate(df):
+        missing = [col for col in COLUMNS if col not in df.columns]
+        if missing:
+            raise InputError([f'missing column(s): {", ".join(missing)}'])
+        raw = df
+        df = df.copy()
+        bad = pd.Series('', index=df.index)
+        for col in NUMERIC:
+            values = pd.to_numeric(df[col], errors='coerce')
+            bad[values.isna()] += f'bad "{col}"; '
+            df[col] = values
+        bad[~df['type'].isin(TYPES).fillna(False)] += 'bad "type"; '
+        bad[df['exercise'].isna()] += 'missing "exercise"; '
+        if (bad != '').any():
+            raise InputError([
+                # +2: 1-based, after the header line
+                f'line {i + 2}: {reason.rstrip("; ")} '
+                f'({", ".join(str(raw.at[i, col]) for col in COLUMNS)})'
+                for i, reason in bad[bad != ''].items()])
+        df['day'] = df['day'].astype('int64')
+        df['type'] = df['type'].astype(str)
+        df['exercise'] = df['exercise'].astype(str)
+        return df
@@ -0,0 +1,79 @@
+import numpy as np
+
+from app.plate_solver import PlateSolver
+
+
+# Loadings considered for a weight use at most this many plates (per side)
+# more than its fewest-plates loading
+MAX_EXTRA_PLATES = 2
+
+
+class LoadingPlanner:
+    def __init__(self, solver: PlateSolver, max_extra: int = MAX_EXTRA_PLATES):
+        '''Chooses, for a lift's sets in order, the loading of each set's
+        weight that moves the fewest plates over the whole sequence, instead
+        of each set's own fewest-plates loading
+        Args:
+        - solver: PlateSolver of the inventory; weights are referred to by
+          their position in its totals (as WeightIndex positions are)
+        - max_extra: loadings with more than this many plates (per side)
+          over a weight's fewest are not considered (see
+          PlateSolver.loadings)
+        '''
+        self.plates = solver.plates
+        self.solver = solver
+        self.max_extra = max_extra
+        # Only the weights a schedule uses are enumerated, as they come up:
+        # a few dozen, out of thousands for a large inventory
+        self._loadings = {}   # position -> its loadings
+        self._distances = {}  # (position, position) -> plates moved
+        self._paths = {}      # positions -> (loadings, plates moved)
+
+    @classmethod
+    def from_index(cls, index, max_extra: int = MAX_EXTRA_PLATES):
+        '''Planner for the inventory of a WeightIndex'''
+        return cls(PlateSolver(index.plate_counts), max_extra)
+
+    def _options(self, position):
+        if position not in self._loadings:
+            self._loadings[position] = self.solver.loadings(
+                position, self.max_extra)
+        return self._loadings[position]
+
+    def _moves(self, a, b):
+        # Plates taken off and put on (per side) to go from each loading of
+        # position <a> to each loading of position <b>
+        if (a, b) not in self._distances:
+            self._distances[a, b] = np.abs(
+                self._options(a)[:, None] - self._options(b)[None]).sum(
+                    axis=2)
+        return self._distances[a, b]
+
+    def plan(self, positions):
+        '''Shortest path through the loadings of <positions> (weights, in
+        set order), starting from an empty bar: each set is a layer of the
+        graph, each loading a node, and each edge costs the plates moved
+        between two loadings. Ties go to the loadings with fewer plates.
+        Returns:
+        - loadings (n_positions x n_plate_types), one per position
+        - plates moved (per side), including loading the first set
+        '''
+        positions = tuple(int(p) for p in positions)
+        if positions in self._paths:
+            return self._paths[positions]
+        if not positions:
+            return np.zeros((0, len(self.plates)), dtype=int), 0
+        cost = self._options(positions[0]).sum(axis=1)
+        back = []
+        for a, b in zip(positions, positions[1:]):
+            total = cost[:, None] + self._moves(a, b)
+            back.append(total.argmin(axis=0))
+            cost = total.min(axis=0)
+        best = [int(cost.argmin())]
+        for prev in reversed(back):
+            best.append(int(prev[best[-1]]))
+        loadings = np.array([
+            self._options(p)[row]
+            for p, row in zip(positions, best[::-1])])
+        self._paths[positions] = loadings, int(cost.min())
+        return self._paths[positions]
@@ -0,0 +1,104 @@
+from fractions import Fraction
+from math import lcm
+
+import numpy as np
+
+
+# Bump whenever solve() can give different results, to invalidate caches
+ALGORITHM_VERSION = 1
+
+
+class PlateSolver:
+    def __init__(self, plate_counts: dict[float, int]):
+        '''Finds every distinct weight that can be loaded on one side of a
+        bar, and the loading that uses the fewest plates for each
+        Args:
+        - plate_counts: {plate weight: number available (per side)}
+        '''
+        self.plates = sorted(
+            float(w) for w, n in plate_counts.items() if n > 0)
+        self.counts = [int(plate_counts[w]) for w in self.plates]
+        self.scale = self._get_scale(self.plates)
+        self.units = [int(round(w * self.scale)) for w in self.plates]
+        self._fewest_plates = None  # see _fewest
+        self._totals = None
+
+    @staticmethod
+    def _get_scale(plates):
+        # Smallest multiplier that makes every plate weight an integer, so
+        # that totals can be compared exactly
+        denominators = [
+            Fraction(str(w)).limit_denominator(1000).denominator
+            for w in plates]
+        return lcm(1, *denominators)
+
+    def solve(self):
+        '''Bounded (multiset) subset-sum over plate types.
+        Returns:
+        - totals: sorted array of achievable per-side weights
+        - loadings: int array (n_totals x n_plate_types) of how many of each
+          plate to use for the minimal-plate loading of each total
+        '''
+        fewest, choices = self._fewest()
+        best = fewest[-1]
+        totals = np.array(sorted(best), dtype=np.int64)
+        loadings = np.zeros((len(totals), len(self.units)), dtype=np.int64)
+        for row, total in enumerate(totals):
+            remaining = int(total)
+            for i in range(len(self.units) - 1, -1, -1):
+                k = choices[i][remaining]
+                loadings[row, i] = k
+                remaining -= k * self.units[i]
+        return totals / self.scale, loadings
+
+    def loadings(self, position: int, max_extra: int = None):
+        '''Every way of loading the achievable weight at <position> in
+        solve()'s totals, or only those using at most <max_extra> plates
+        more than the fewest: int array (n_loadings x n_plate_types), fewest
+        plates first
+        '''
+        fewest, _ = self._fewest()
+        total = self._totals[position]
+        limit = fewest[-1][total] + (
+            np.inf if max_extra is None else max_extra)
+        loadings = []
+        counts = [0] * len(self.units)
+
+        def fill(i, remaining, n_plates):
+            # Heaviest plate type first; types i - 1, ..., 0 are left
+            if i == 0:
+                loadings.append(list(counts))
+                return
+            unit = self.units[i - 1]
+            for k in range(min(self.counts[i - 1], remaining // unit) + 1):
+                rest = fewest[i - 1].get(remaining - k*unit)
+                if rest is not None and n_plates + k + rest <= limit:
+                    counts[i - 1] = k
+                    fill(i - 1, remaining - k*unit, n_plates + k)
+            counts[i - 1] = 0
+
+        fill(len(self.units), total, 0)
+        loadings.sort(key=sum)
+        return np.array(loadings, dtype=np.int64).reshape(-1, len(self.units))
+
+    def _fewest(self):
+        # fewest[i][total]: fewest plates reaching <total> with the <i>
+        # lightest plate types; choices[i][total]: how many of plate type
+        # <i> that used. Computed once, for solve() and loadings()
+        if self._fewest_plates is None:
+            fewest = [{0: 0}]
+            choices = []
+            for unit, count in zip(self.units, self.counts):
+                new = dict(fewest[-1])
+                chosen = dict.fromkeys(fewest[-1], 0)
+                for total, n_plates in fewest[-1].items():
+                    for k in range(1, count + 1):
+                        t = total + k*unit
+                        if t not in new or n_plates + k < new[t]:
+                            new[t] = n_plates + k
+                            chosen[t] = k
+                fewest.append(new)
+                choices.append(chosen)
+            self._fewest_plates = fewest, choices
+            self._totals = sorted(fewest[-1])
+        return self._fewest_plates
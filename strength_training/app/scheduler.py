@@ -1,88 +1,15 @@
+import numpy as np
 import pandas as pd
 
-
-class Exercise:
-    def __init__(
-            self, name:str,
-            training_max: float,
-            reps_percents,
-            increment: float):
-        self.name = name
-        self.training_max = training_max
-        self.reps_percents = reps_percents
-        self.increment = increment
-
-    def make_row(self):
-        row = pd.concat([self._make_week(w) for w in range(1, 5)], axis=1)
-        row.index = [self.name] * len(row)
-        row.replace(0, pd.NA, inplace=True)
-        row['Increment for Next Cycle'] = (
-            [self.increment] + (len(row) - 1)*[pd.NA])
-        return row                        
-
-    def _make_week(self, week):
-        reps_percents = self.reps_percents[f'week{week}']
-        data = [
-            [r, round(p * self.training_max, 2)] for (r, p) in reps_percents]
-        df = pd.DataFrame(
-            data,
-            columns=pd.MultiIndex.from_tuples(
-                [(f'Week {week}', 'Reps'), (f'Week {week}', 'Weight')]))
-        return df        
-
-
-class MainExercise(Exercise):
-    def __init__(
-            self, name: str,
-            training_max: float,
-            increment: float,
-            is_extended: bool = False):
-        reps_percents = {
-            # (reps, % of max)
-            'week1': [
-                (5, 0.4), (5, 0.47), (3, 0.55), (5, 0.65), (5, 0.75), (5, 0.85)
-            ],
-            'week2': [
-                (5, 0.4), (5, 0.5), (3, 0.6), (3, 0.7), (3, 0.8), (3, 0.9)],
-            'week3': [
-                (5, 0.4), (5, 0.5), (3, 0.6), (5, 0.75), (3, 0.85), (1, 0.95)],
-            # Deload week
-            'week4': [
-                (0, 0), (0, 0), (0, 0), (5, 0.4), (5, 0.5), (5, 0.6)]}
-        if not is_extended:
-            reps_percents = {k: v[3:] for k, v in reps_percents.items()}
-        super().__init__(name, training_max, reps_percents, increment)
+from app.templates import TEMPLATES, Template
 
 
-class SupportingExercise(Exercise):
-    def __init__(self, name: str, training_max: float, increment: float):
-        reps_percents = {
-            # (reps, % of max)
-            'week1': [('5x10', 0.85)],
-            'week2': [('5x10', 0.9)],
-            'week3': [('5x10', 0.95)],
-            # Deload week
-            'week4': [('5x10', 0.6)]}
-        super().__init__(name, training_max, reps_percents, increment)
-
-
-class ScheduleRow:
+class Scheduler:
     def __init__(
             self,
-            main_exercises: tuple[MainExercise],
-            supporting_exercises: tuple[SupportingExercise]):
-        self.main_exercises = main_exercises
-        self.supporting_exercises = supporting_exercises
-
-    def make_row(self):
-        df = pd.concat(
-            [*[m.make_row() for m in self.main_exercises],
-             *[se.make_row() for se in self.supporting_exercises]])
-        return df
-
-
-class Scheduler:
-    def __init__(self, exercises: list[dict], is_extended: bool = False):
+            exercises: list[dict],
+            is_extended: bool = False,
+            templates: dict[str, Template] = None):
         '''Make a work out schedule for one (4-week) cycle
         Args:
         - exercises: each entry is a single day's exercises, formatted as:
@@ -104,25 +31,117 @@ class Scheduler:
               {...}
           ]
         - is_extended: if True does long form (more sets for main exercise)
+        - templates: program templates by name (defaults to the built-in
+          ones; see app.templates.load_templates for user-defined ones)
         '''
         self.exercises = exercises
         self.is_extended = is_extended
+        self.templates = TEMPLATES if templates is None else templates
 
-    def make_schedule(self):
-        dfs = []
+    def _template_for(self, kind):
+        if kind == 'main' and self.is_extended:
+            return self.templates['main_extended']
+        return self.templates[kind]
+
+    def _flatten(self):
+        # One record per exercise, in schedule order
+        days, names, kinds, training_maxes, increments = [], [], [], [], []
         for i, day in enumerate(self.exercises):
-            main_exercises = [
-                MainExercise(name, tr_mx, incr, self.is_extended)
-                for (name, tr_mx, incr) in day['main']]
-            supporting_exercises = [
-                SupportingExercise(name, tr_mx, incr)
-                for (name, tr_mx, incr) in day['support']]
-            row = ScheduleRow(main_exercises, supporting_exercises).make_row()
-            row.index = pd.MultiIndex.from_tuples(
-                [(i + 1, idx) for idx in row.index])
-            dfs.append(row)
-        df = pd.concat(dfs)
-        df.reset_index(drop=False, inplace=True)
-        df.rename(
-            columns={'level_0': 'Day', 'level_1': 'Exercise'}, inplace=True)
-        return df
+            for kind in ['main', 'support']:
+                for (name, tr_mx, incr) in day[kind]:
+                    days.append(i + 1)
+                    names.append(name)
+                    kinds.append(kind)
+                    training_maxes.append(tr_mx)
+                    increments.append(incr)
+        return (
+            np.array(days, dtype=int),
+            np.array(names, dtype=object),
+            np.array(kinds),
+            np.array(training_maxes, dtype=float),
+            np.array(increments, dtype=float))
+
+    def make_schedule(self):
+        return self.project(1).drop(columns='Cycle', level=0)
+
+    def training_maxes(self, n_cycles: int):
+        '''Training max of every exercise (rows, in schedule order) for each
+        of the next <n_cycles> cycles (columns), assuming every cycle is
+        completed and incremented
+        '''
+        _, _, _, training_maxes, increments = self._flatten()
+        cycles = np.arange(n_cycles)
+        return training_maxes[:, None] + increments[:, None]*cycles
+
+    def project(self, n_cycles: int):
+        '''Schedules for the next <n_cycles> cycles as one DataFrame, with a
+        leading Cycle column (1, 2, ...)
+        '''
+        return self._build(self.training_maxes(n_cycles))
+
+    def iter_cycles(self, n_cycles: int):
+        '''Lazily yields (cycle, schedule) for each of the next <n_cycles>
+        cycles
+        '''
+        training_maxes = self.training_maxes(n_cycles)
+        for c in range(n_cycles):
+            schedule = self._build(training_maxes[:, [c]])
+            yield c + 1, schedule.drop(columns='Cycle', level=0)
+
+    def _build(self, training_maxes):
+        # <training_maxes>: (n_exercises x n_cycles)
+        days, names, kinds, _, increments = self._flatten()
+        n_cycles = training_maxes.shape[1]
+        # One broadcast per template; blocks are (cycle, exercise x set, week)
+        blocks = {}
+        for kind in ['main', 'support']:
+            template = self._template_for(kind)
+            idx = np.flatnonzero(kinds == kind)
+            weights = template.weights(training_maxes[idx])
+            blocks[kind] = (
+                idx,
+                template.n_sets,
+                weights.transpose(1, 0, 3, 2).reshape(
+                    n_cycles, -1, template.n_weeks),
+                np.tile(template.reps.T, (len(idx), 1)))
+        n_weeks = {block[2].shape[2] for block in blocks.values()}
+        if len(n_weeks) != 1:
+            raise ValueError(
+                'All templates must have the same number of weeks')
+        n_weeks = n_weeks.pop()
+        # Place each exercise's block of rows in schedule order
+        n_sets = np.zeros(len(names), dtype=int)
+        for idx, sets, _, _ in blocks.values():
+            n_sets[idx] = sets
+        starts = np.cumsum(n_sets) - n_sets
+        n_rows = n_sets.sum()
+        weights = np.zeros((n_cycles, n_rows, n_weeks))
+        reps = np.zeros((n_rows, n_weeks), dtype=object)
+        for idx, sets, block_weights, block_reps in blocks.values():
+            rows = (starts[idx][:, None] + np.arange(sets)).ravel()
+            weights[:, rows] = block_weights
+            reps[rows] = block_reps
+        weights = weights.reshape(-1, n_weeks)
+        reps = np.tile(reps, (n_cycles, 1))
+        exercise = np.tile(np.repeat(np.arange(len(names)), n_sets), n_cycles)
+        is_first = np.zeros(n_rows, dtype=bool)
+        is_first[starts] = True
+        is_first = np.tile(is_first, n_cycles)
+        data = {
+            ('Cycle', ''): np.repeat(np.arange(1, n_cycles + 1), n_rows),
+            ('Day', ''): days[exercise],
+            ('Exercise', ''): names[exercise]}
+        for w in range(n_weeks):
+            data[(f'Week {w + 1}', 'Reps')] = self._blank_zeros(reps[:, w])
+            data[(f'Week {w + 1}', 'Weight')] = self._blank_zeros(
+                weights[:, w])
+        data[('Increment for Next Cycle', '')] = np.where(
+            is_first, increments[exercise].astype(object), pd.NA)
+        return pd.DataFrame(data)
+
+    @staticmethod
+    def _blank_zeros(col):
+        # Skipped sets (0 reps / 0 weight) are left empty in the schedule
+        if col.dtype != object and not (col == 0).any():
+            return col
+        return np.where(col == 0, pd.NA, col.astype(object))
@@ -0,0 +1,71 @@
+import glob
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+from app.plate_solver import ALGORITHM_VERSION, PlateSolver
+
+
+CACHE = './data/weights/.cache'
+
+
+class SolverCache:
+    def __init__(self, cache_dir: str = CACHE):
+        '''On-disk cache of PlateSolver results, keyed by a hash of the
+        inventory and the solver version. Only the latest entry per implement
+        is kept.
+        '''
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def key(bar: float, plate_counts: dict[float, int]):
+        inventory = ','.join(
+            f'{float(w)!r}:{int(n)}' for w, n in sorted(plate_counts.items()))
+        content = f'v{ALGORITHM_VERSION}|bar:{float(bar)!r}|{inventory}'
+        return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+    def path(self, name: str, key: str):
+        return f'{self.cache_dir}/{name}-{key}.npz'
+
+    def solve(self, name: str, bar: float, plate_counts: dict[float, int]):
+        '''Cached PlateSolver(plate_counts).solve()
+        Args:
+        - name: implement the inventory is for (e.g. "bar")
+        Returns: (plates, totals, loadings, path to cache entry, was_hit)
+        '''
+        path = self.path(name, self.key(bar, plate_counts))
+        if os.path.exists(path):
+            with np.load(path) as entry:
+                return (
+                    entry['plates'].tolist(),
+                    entry['totals'],
+                    entry['loadings'],
+                    path,
+                    True)
+        solver = PlateSolver(plate_counts)
+        totals, loadings = solver.solve()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Written under a name of its own and renamed into place, so that
+        # another process (e.g. a BatchRunner worker) never loads a
+        # half-written entry
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(
+                f,
+                plates=np.array(solver.plates),
+                totals=totals,
+                loadings=loadings)
+        os.replace(tmp, path)
+        self._evict(name, keep=path)
+        return solver.plates, totals, loadings, path, False
+
+    def _evict(self, name, keep):
+        # Entries for an older version of this implement's inventory
+        for path in glob.glob(f'{self.cache_dir}/{name}-*.npz'):
+            if path != keep:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass  # another process evicted it first
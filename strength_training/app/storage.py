@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from app.formats import get_format
+
+
+SEP = '/'  # joins two-level column headers, e.g. "Week 1/Reps"
+
+
+def save_table(df: pd.DataFrame, path: str):
+    '''Save a schedule or combo table; the format is taken from the file
+    extension (see app.formats.FORMATS). CSV is written as is, for export;
+    binary formats get flat, typed columns so they can be loaded column by
+    column.
+    '''
+    fmt = get_format(path)
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+        return
+    df = _typed(_flatten_columns(df))
+    if fmt == 'parquet':
+        df.to_parquet(path, index=False)
+    elif fmt == 'feather':
+        df.to_feather(path)
+    else:
+        np.savez(path, **{col: _to_array(df[col]) for col in df.columns})
+
+
+def load_table(path: str, columns: list = None):
+    '''Load a table saved with save_table
+    Args:
+    - columns: if given, only these columns are read (names as saved, e.g.
+      "Week 1/Weight", or (top, bottom) tuples)
+    '''
+    fmt = get_format(path)
+    if fmt == 'csv':
+        header = [0, 1] if _has_two_row_header(path) else 0
+        df = pd.read_csv(path, header=header)
+        if header == [0, 1]:
+            df.columns = pd.MultiIndex.from_tuples(
+                [(top, '' if bottom.startswith('Unnamed') else bottom)
+                 for top, bottom in df.columns])
+        return df if columns is None else df[columns]
+    if columns is not None:
+        columns = [
+            SEP.join(c for c in col if c) if isinstance(col, tuple) else col
+            for col in columns]
+    if fmt == 'parquet':
+        df = pd.read_parquet(path, columns=columns)
+    elif fmt == 'feather':
+        # Memory-mapped, so unread columns are never touched
+        from pyarrow import feather
+        df = feather.read_table(
+            path, columns=columns, memory_map=True).to_pandas()
+    else:
+        # npz members are only decompressed when accessed
+        with np.load(path) as data:
+            df = pd.DataFrame(
+                {col: data[col] for col in (columns or data.files)})
+    return _restore_columns(df)
+
+
+def _has_two_row_header(path):
+    # Schedules have a second header row of "Reps"/"Weight" under each week
+    with open(path, 'r') as f:
+        f.readline()
+        second = f.readline()
+    return 'Weight' in second.split(',')
+
+
+def _flatten_columns(df):
+    if not isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = [str(col) for col in df.columns]
+        return df
+    df = df.copy()
+    df.columns = [SEP.join(c for c in col if c) for col in df.columns]
+    return df
+
+
+def _restore_columns(df):
+    if not any(SEP in col for col in df.columns):
+        return df
+    df.columns = pd.MultiIndex.from_tuples(
+        [tuple(col.split(SEP)) if SEP in col else (col, '')
+         for col in df.columns])
+    return df
+
+
+def _to_array(col):
+    # Plain NumPy arrays (no pickled objects) for .npz
+    if pd.api.types.is_numeric_dtype(col):
+        if col.hasnans:
+            return col.to_numpy(dtype=float, na_value=np.nan)
+        return col.to_numpy()
+    return col.to_numpy(dtype=str, na_value='')
+
+
+def _typed(df):
+    # Mixed object columns (e.g. Reps: 5 or "5x10", blanks as NA) become
+    # nullable floats where possible, else nullable strings
+    for col in df.columns:
+        if df[col].dtype != object:
+            continue
+        try:
+            df[col] = pd.to_numeric(df[col]).astype('Float64')
+        except (TypeError, ValueError):
+            df[col] = df[col].astype('string')
+    return df
@@ -0,0 +1,90 @@
+import json
+from functools import cache
+
+import numpy as np
+
+
+# (reps, % of max) per set, per week
+MAIN_EXTENDED = {
+    'week1': [
+        (5, 0.4), (5, 0.47), (3, 0.55), (5, 0.65), (5, 0.75), (5, 0.85)],
+    'week2': [
+        (5, 0.4), (5, 0.5), (3, 0.6), (3, 0.7), (3, 0.8), (3, 0.9)],
+    'week3': [
+        (5, 0.4), (5, 0.5), (3, 0.6), (5, 0.75), (3, 0.85), (1, 0.95)],
+    # Deload week
+    'week4': [
+        (0, 0), (0, 0), (0, 0), (5, 0.4), (5, 0.5), (5, 0.6)]}
+MAIN = {week: sets[3:] for week, sets in MAIN_EXTENDED.items()}
+SUPPORT = {
+    'week1': [('5x10', 0.85)],
+    'week2': [('5x10', 0.9)],
+    'week3': [('5x10', 0.95)],
+    # Deload week
+    'week4': [('5x10', 0.6)]}
+
+
+class Template:
+    def __init__(self, name: str, weeks: dict[str, list[tuple]]):
+        '''A program template compiled to arrays of shape (weeks x sets)
+        Args:
+        - name: template name (e.g. "main")
+        - weeks: {"week1": [(reps, % of max), ...], "week2": ...}; every
+          week must have the same number of sets ((0, 0) for a skipped set)
+        '''
+        self.name = name
+        ordered = [weeks[week] for week in sorted(weeks, key=self._week_n)]
+        n_sets = {len(sets) for sets in ordered}
+        if len(n_sets) != 1:
+            raise ValueError(
+                f'Template {name}: every week needs the same number of sets')
+        self.reps = np.array(
+            [[reps for reps, _ in sets] for sets in ordered], dtype=object)
+        self.percents = np.array(
+            [[pct for _, pct in sets] for sets in ordered], dtype=float)
+        self.reps.flags.writeable = False
+        self.percents.flags.writeable = False
+
+    @staticmethod
+    def _week_n(week):
+        return int(week.replace('week', ''))
+
+    @property
+    def n_weeks(self):
+        return self.percents.shape[0]
+
+    @property
+    def n_sets(self):
+        return self.percents.shape[1]
+
+    def weights(self, training_maxes):
+        '''Weights for every exercise, week and set in one broadcast
+        Args:
+        - training_maxes: array of shape (n_exercises,), or
+          (n_exercises, n_cycles) to project several cycles at once
+        Returns: array of shape training_maxes.shape + (n_weeks, n_sets)
+        '''
+        training_maxes = np.asarray(training_maxes, dtype=float)
+        return np.round(training_maxes[..., None, None] * self.percents, 2)
+
+
+TEMPLATES = {
+    'main': Template('main', MAIN),
+    'main_extended': Template('main_extended', MAIN_EXTENDED),
+    'support': Template('support', SUPPORT)}
+
+
+@cache
+def load_templates(path: str):
+    '''Built-in templates, updated with any user-defined ones in the JSON
+    file at <path>, formatted as:
+    {"main": {"week1": [[5, 0.65], [5, 0.75], ...], "week2": ...}, ...}
+    '''
+    with open(path, 'r') as f:
+        user_templates = json.load(f)
+    templates = dict(TEMPLATES)
+    for name, weeks in user_templates.items():
+        templates[name] = Template(
+            name, {week: [tuple(s) for s in sets]
+                   for week, sets in weeks.items()})
+    return templates
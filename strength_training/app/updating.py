@@ -1,8 +1,66 @@
+import json
+import os
+import time
+
 import pandas as pd
 
 
 class Updater:
     def update(self, inpath):
+        '''Increment every training max in the input file at <inpath> for
+        the next cycle. The change is first appended to a journal
+        (<inpath>.journal, one JSON line per update, see undo) and the file
+        is then replaced in one atomic rename, so a crash leaves either the
+        old or the new file, never a half-written one.
+        '''
         data = pd.read_csv(inpath)
+        before = data.training_max.tolist()
         data.training_max += data.increment_per_cycle
-        data.to_csv(inpath, index=False)
+        self._journal(inpath, {
+            'time': time.time(),
+            'exercise': data.exercise.tolist(),
+            'before': before,
+            'after': data.training_max.tolist()})
+        _write_atomic(data, inpath)
+
+    def undo(self, inpath):
+        '''Put back the training maxes from before the last update'''
+        journal = f'{inpath}.journal'
+        with open(journal, 'r') as f:
+            entries = f.readlines()
+        if not entries:
+            raise ValueError(f'No updates to undo in {journal}')
+        last = json.loads(entries[-1])
+        data = pd.read_csv(inpath)
+        if data.exercise.tolist() != last['exercise']:
+            raise ValueError(
+                f'{inpath} has changed since its last update; not undoing')
+        data.training_max = last['before']
+        _write_atomic(data, inpath)
+        _replace_lines(journal, entries[:-1])
+
+    @staticmethod
+    def _journal(inpath, entry):
+        with open(f'{inpath}.journal', 'a') as f:
+            f.write(json.dumps(entry) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+
+def _write_atomic(data, path):
+    # Same directory as <path>, so the rename cannot cross file systems
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        data.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _replace_lines(path, lines):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        f.writelines(lines)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
@@ -1,24 +1,61 @@
+import os
+import sys
+from collections import Counter
+
 import numpy as np
 import pandas as pd
 
+# So that `python app/weight_chart.py` (as well as `python -m
+# app.weight_chart`) can import the app package
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.plate_solver import PlateSolver
+from app.solver_cache import SolverCache
+from app.storage import save_table
+
 
 DATA = './data/weights'
 
 
 class WeightChart:
-    def make_chart(self, dumb_bar: str):
+    def __init__(self, cache: SolverCache = None):
+        '''
+        Args:
+        - cache: if given, charts are only regenerated when the inventory
+          (or the solver) has changed since the last run
+        '''
+        self.cache = cache
+
+    def make_chart(self, dumb_bar: str, fmt: str = 'csv'):
         '''Makes a chart of all possible weight combinations given your weights
         Args:
         - dumb_bar: either "dumb" or "bar"
+        - fmt: output format (see app.formats.FORMATS); binary formats store
+          how many of each plate to use, one column per plate weight
         '''
-        bar, half_plates = self._read_weights(dumb_bar)
-        df = self._init_data(half_plates)
+        bar, half_plates = self.read_weights(dumb_bar)
+        outpath = f'{DATA}/{dumb_bar}_combos.{fmt}'
+        solution = None
+        if self.cache is not None:
+            plates, _, loadings, entry, hit = self.cache.solve(
+                dumb_bar, bar, Counter(half_plates))
+            if hit and self._is_newer(outpath, entry):
+                print(f'{dumb_bar} weights unchanged; keeping {outpath}')
+                return
+            solution = (plates, loadings)
+        df = self._init_data(half_plates, solution)
         out = self._compile_df(df, bar)
-        outpath = f'{DATA}/{dumb_bar}_combos.csv'
-        out.to_csv(outpath, index=False)        
+        if fmt != 'csv':
+            out = self._to_counts(out)
+        save_table(out, outpath)
 
     @staticmethod
-    def _read_weights(dumb_bar):
+    def _is_newer(path, than):
+        return (
+            os.path.exists(path)
+            and os.path.getmtime(path) >= os.path.getmtime(than))
+
+    @staticmethod
+    def read_weights(dumb_bar):
         path = f'{DATA}/{dumb_bar}_weights.csv'
         data = pd.read_csv(path, index_col=0)
         bar = data.index[0]
@@ -34,14 +71,21 @@ class WeightChart:
         return bar, plates
 
     @staticmethod
-    def _init_data(half_plates):
-        n_plates = len(half_plates)
-        n_combos = 2 ** n_plates
-        data = [
-            [int(i) for i in list(f'{str(bin(n))[2:]:>0{n_plates}s}')]
-            for n in range(n_combos)]
-        df = pd.DataFrame(
-            np.array(data) * np.array(half_plates), columns=half_plates)
+    def _init_data(half_plates, solution=None):
+        # One row per distinct achievable weight (minimal-plate loading), in
+        # the same wide format as before: a column per individual plate,
+        # holding its weight if used, else 0. <solution>: (plate types,
+        # loadings) if already solved
+        if solution is None:
+            solver = PlateSolver(Counter(half_plates))
+            solution = (solver.plates, solver.solve()[1])
+        plates, loadings = solution
+        data = np.zeros((len(loadings), len(half_plates)))
+        for i, plate in enumerate(plates):
+            cols = [j for j, w in enumerate(half_plates) if w == plate]
+            for n, col in enumerate(cols):
+                data[:, col] = np.where(loadings[:, i] > n, plate, 0.)
+        df = pd.DataFrame(data, columns=half_plates)
         return df
 
     @staticmethod
@@ -52,6 +96,18 @@ class WeightChart:
             .drop_duplicates(subset=['weight'])
             .sort_values('weight', ignore_index=True))
 
+    @staticmethod
+    def _to_counts(df):
+        # One column per plate weight (count per side) instead of one per
+        # plate, so column names are unique
+        counts = {'weight': df['weight'].to_numpy()}
+        for col, values in zip(df.columns, df.to_numpy().T):
+            if col == 'weight':
+                continue
+            name = f'{col:g}'
+            counts[name] = counts.get(name, 0) + (values > 0).astype(int)
+        return pd.DataFrame(counts)
+
 
 if __name__ == '__main__':
     WeightChart().make_chart('bar')
@@ -0,0 +1,188 @@
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from app.plate_sequence import LoadingPlanner
+from app.plate_solver import PlateSolver
+from app.solver_cache import SolverCache
+from app.weight_chart import WeightChart
+
+
+class WeightIndex:
+    def __init__(
+            self,
+            bar: float,
+            half_plates: list[float],
+            cache: SolverCache = None,
+            name: str = None):
+        '''Sorted index of every weight loadable with the given inventory
+        Args:
+        - bar: weight of the empty bar (or dumbbell handle)
+        - half_plates: plates available for one side (see
+          WeightChart.read_weights)
+        - cache, name: optional SolverCache, and the implement name to cache
+          under
+        '''
+        if cache is None:
+            solver = PlateSolver(Counter(half_plates))
+            plates = solver.plates
+            sides, loadings = solver.solve()
+        else:
+            plates, sides, loadings, _, _ = cache.solve(
+                name, bar, Counter(half_plates))
+        self.bar = float(bar)
+        self.plate_counts = Counter(half_plates)
+        self.weights = self.bar + 2*sides
+        self.loadings = np.array(
+            [self._describe(plates, row) for row in loadings], dtype=object)
+
+    @classmethod
+    def from_inventory(cls, dumb_bar: str, cache: SolverCache = None):
+        '''Build the index from data/weights/<dumb_bar>_weights.csv'''
+        bar, half_plates = WeightChart.read_weights(dumb_bar)
+        return cls(bar, half_plates, cache, dumb_bar)
+
+    @staticmethod
+    def _describe(plates, counts):
+        # Plates per side, heaviest first: e.g. "44 + 5.5 + 5.5"
+        per_side = [
+            f'{plate:g}'
+            for plate, n in zip(plates[::-1], counts[::-1])
+            for _ in range(n)]
+        return ' + '.join(per_side)
+
+    def floor(self, weights):
+        '''Heaviest achievable weight <= each of <weights> (NaN if none)'''
+        weights = np.asarray(weights, dtype=float)
+        i = np.searchsorted(self.weights, weights, side='right') - 1
+        return self._take(self.weights, i, weights), i
+
+    def nearest(self, weights):
+        '''Closest achievable weight to each of <weights> (ties go down; NaN
+        if lighter than the empty bar)
+        '''
+        weights = np.asarray(weights, dtype=float)
+        hi = np.clip(
+            np.searchsorted(self.weights, weights), 0, len(self.weights) - 1)
+        lo = np.clip(hi - 1, 0, None)
+        go_lo = (
+            np.abs(weights - self.weights[lo])
+            <= np.abs(self.weights[hi] - weights))
+        i = np.where(go_lo, lo, hi)
+        i[weights < self.weights[0]] = -1
+        return self._take(self.weights, i, weights), i
+
+    def plates_for(self, i):
+        '''Plate loading (per side) at index positions <i> from floor/nearest
+        '''
+        i = np.asarray(i)
+        return self._take(self.loadings, i, None, fill=None)
+
+    @staticmethod
+    def _take(arr, i, weights, fill=np.nan):
+        valid = i >= 0
+        if weights is not None:
+            valid &= ~np.isnan(weights)
+        out = np.full(i.shape, fill, dtype=arr.dtype)
+        out[valid] = arr[i[valid]]
+        return out
+
+
+class PlateAnnotator:
+    def __init__(
+            self, indexes: dict[str, WeightIndex], mode: str = 'nearest'):
+        '''Snaps schedule weights to loadable ones and adds plate columns
+        Args:
+        - indexes: {implement: WeightIndex}, e.g. {'bar': ..., 'dumb': ...}
+        - mode: "nearest" or "floor"
+        '''
+        self.indexes = indexes
+        self.mode = mode
+        self._planners = {}  # implement -> LoadingPlanner, made when needed
+
+    @classmethod
+    def from_inventory(
+            cls, mode: str = 'nearest', cache: SolverCache = None):
+        return cls(
+            {bell: WeightIndex.from_inventory(bell, cache)
+             for bell in ['bar', 'dumb']},
+            mode)
+
+    @staticmethod
+    def implement_for(exercise: str):
+        # Dumbbell lifts are named "db ..." in the input files
+        return 'dumb' if exercise.startswith('db ') else 'bar'
+
+    def annotate(self, schedule: pd.DataFrame, min_changes: bool = False):
+        '''Returns a copy of <schedule> (as made by Scheduler.make_schedule)
+        with every Weight snapped to an achievable weight and a Plates column
+        added after each Weight column. Weights that cannot be loaded (e.g.
+        lighter than the empty bar) are left as they are.
+
+        Each set is loaded with its fewest plates, or if <min_changes>, each
+        lift's sets (in one week) are loaded so as to move the fewest plates
+        between them (see LoadingPlanner).
+        '''
+        df = schedule.copy()
+        weeks = [col[0] for col in df.columns if col[1] == 'Weight']
+        raw = np.column_stack(
+            [pd.to_numeric(df[(week, 'Weight')], errors='coerce')
+             .to_numpy(dtype=float, na_value=np.nan)
+             for week in weeks])
+        implements = df[('Exercise', '')].map(self.implement_for)
+        snapped = raw.copy()
+        plates = np.full(raw.shape, None, dtype=object)
+        lifts = self._lifts(df) if min_changes else None
+        for implement, index in self.indexes.items():
+            rows = (implements == implement).to_numpy()
+            if not rows.any():
+                continue
+            weights, i = getattr(index, self.mode)(raw[rows])
+            loadable = ~np.isnan(weights)
+            snapped[rows] = np.where(loadable, weights, raw[rows])
+            positions = np.where(loadable, i, -1)
+            if min_changes:
+                plates[rows] = self._sequence_plates(
+                    implement, index, positions, lifts[rows])
+            else:
+                plates[rows] = index.plates_for(positions)
+        columns = []
+        for col in df.columns:
+            columns.append(col)
+            if col[1] == 'Weight':
+                columns.append((col[0], 'Plates'))
+        for j, week in enumerate(weeks):
+            df[(week, 'Weight')] = np.where(
+                np.isnan(snapped[:, j]), pd.NA, snapped[:, j])
+            df[(week, 'Plates')] = plates[:, j]
+        return df[columns]
+
+    @staticmethod
+    def _lifts(df):
+        # Number of the lift (one exercise on one day of one cycle) each row
+        # is a set of
+        new = np.zeros(len(df), dtype=bool)
+        new[:1] = True
+        for col in [('Cycle', ''), ('Day', ''), ('Exercise', '')]:
+            if col in df.columns:
+                values = df[col].to_numpy()
+                new[1:] |= values[1:] != values[:-1]
+        return np.cumsum(new)
+
+    def _sequence_plates(self, implement, index, positions, lifts):
+        # Plates of each set, chosen lift by lift and week by week; sets that
+        # cannot be loaded (position -1) are skipped
+        if implement not in self._planners:
+            self._planners[implement] = LoadingPlanner.from_index(index)
+        planner = self._planners[implement]
+        plates = np.full(positions.shape, None, dtype=object)
+        bounds = np.flatnonzero(np.diff(lifts)) + 1
+        for sets in np.split(np.arange(len(lifts)), bounds):
+            for j in range(positions.shape[1]):
+                loaded = sets[positions[sets, j] >= 0]
+                loadings, _ = planner.plan(positions[loaded, j])
+                plates[loaded, j] = [
+                    index._describe(planner.plates, loading)
+                    for loading in loadings]
+        return plates
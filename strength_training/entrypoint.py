@@ -3,7 +3,9 @@
 #----------------------------------------------------------------------
 #
 # Usage
-# entrypoint.py [-i INFILE][-o OUTFILE][-w UPDATE]
+# entrypoint.py [-i INFILE][-o OUTFILE][-w UPDATE][-p PLATES][-m MIN_CHANGES]
+#               [-t TEMPLATES][-c CYCLES][-f FORMAT][--no-history]
+#               [-b BATCH [-d OUTDIR][-n WORKERS]]
 #
 # -i: input file name:
 #     INFILE (str): name of input file (defaults to "input.csv")
@@ -11,29 +13,69 @@
 #     OUTFILE (str): name of output file (defaults to "schedule.csv")
 # -w: Updates available weights:
 #     UPDATE (str): true | false (defaults to false)
+# -p: Snaps weights to loadable ones and adds the plates to use:
+#     PLATES (str): true | false (defaults to false)
+# -m: With -p, loads each lift's sets to move the fewest plates between
+#     them, rather than each set with its fewest plates:
+#     MIN_CHANGES (str): true | false (defaults to false)
+# -t: Program templates file:
+#     TEMPLATES (str): name of a JSON file in data/ overriding/adding
+#     templates (see app/templates.py)
+# -c: Number of cycles to project:
+#     CYCLES (int): defaults to 1; if more, each cycle's training maxes are
+#     incremented from the last, and the schedule gets a Cycle column
+# -f: Output format for schedules and weight combos:
+#     FORMAT (str): csv | parquet | feather | npz (defaults to csv)
+# -b: Batch (roster) mode, replaces -i/-o:
+#     BATCH (str): name of a directory of input files (one per athlete) or
+#     of a roster file with an "athlete" column, in data/
+# -d: Output directory for batch mode:
+#     OUTDIR (str): directory in data/ (defaults to "schedules")
+# -n: Number of worker processes for batch mode:
+#     WORKERS (int): defaults to the number of CPUs
+# --no-history: Do not add the training maxes to the workout history (see
+#     common/history.py). Batch mode never adds to it.
 #
 #----------------------------------------------------------------------
 import argparse
+import os
 import sys
 
-from app.input_handling import InputReader
-from app.scheduler import Scheduler
-from app.updating import Updater
-from app.weight_chart import WeightChart
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.history import History
+
+# The rest of app (and pandas with it) is imported only by the functions
+# that use it, so --help is instant
+from app.formats import FORMATS
 
 DATA = './data'
 
 
 def main(args):
-    infile, outfile, do_weight_update = parse_args(args)
-    print(
-        f'Running with args:\n'
-        f'  infile:         {infile}\n'
-        f'  outfile:        {outfile}\n'
-        f'  update_weights: {do_weight_update}')
-    if do_weight_update:
-        update_weights()
-    create_cycle_from_input_file(infile, outfile)
+    args = parse_args(args)
+    print('Running with args:')
+    for name, val in args.items():
+        print(f'  {name:15s} {val}')
+    if args['weight_update']:
+        update_weights(args['format'])
+    cycle_kwargs = {
+        'do_plates': args['plates'],
+        'min_changes': args['min_changes'],
+        'templates_path': (
+            None if args['templates'] is None
+            else f'{DATA}/{args["templates"]}'),
+        'n_cycles': args['cycles']}
+    if args['batch'] is not None:
+        create_cycles_for_roster(
+            args['batch'],
+            args['outdir'],
+            args['workers'],
+            args['format'],
+            cycle_kwargs)
+    else:
+        create_cycle_from_input_file(
+            args['infile'], args['outfile'], cycle_kwargs,
+            not args['no_history'])
 
 
 def parse_args(args):
@@ -53,33 +95,123 @@ def parse_args(args):
         '--weight_update',
         help='if -w, available weights will be updated',
         default='false')
-    args = parser.parse_args()
-    return (
-        [check_extensions(f) for f in (args.infile, args.outfile)]
-        + [args.weight_update.lower() == 'true'])
+    parser.add_argument(
+        '-p',
+        '--plates',
+        help='if -p true, weights are snapped to loadable ones with plates',
+        default='false')
+    parser.add_argument(
+        '-m',
+        '--min_changes',
+        help='if -m true (with -p true), sets are loaded to move the fewest '
+        'plates',
+        default='false')
+    parser.add_argument(
+        '-t',
+        '--templates',
+        help='JSON file of program templates (e.g., "templates.json")',
+        default=None)
+    parser.add_argument(
+        '-c',
+        '--cycles',
+        help='number of cycles to project',
+        type=int,
+        default=1)
+    parser.add_argument(
+        '-f',
+        '--format',
+        help='output format (csv, parquet, feather, npz)',
+        choices=FORMATS,
+        default='csv')
+    parser.add_argument(
+        '-b',
+        '--batch',
+        help='roster directory or file in data/ (e.g., "roster.csv")',
+        default=None)
+    parser.add_argument(
+        '-d',
+        '--outdir',
+        help='output directory for batch mode (e.g., "schedules")',
+        default='schedules')
+    parser.add_argument(
+        '-n',
+        '--workers',
+        help='number of worker processes for batch mode',
+        type=int,
+        default=None)
+    parser.add_argument(
+        '--no-history',
+        help='do not add the training maxes to the workout history',
+        action='store_true')
+    args = vars(parser.parse_args())
+    args['infile'] = check_extensions(args['infile'])
+    args['outfile'] = check_extensions(args['outfile'], args['format'])
+    args['weight_update'] = args['weight_update'].lower() == 'true'
+    args['plates'] = args['plates'].lower() == 'true'
+    args['min_changes'] = args['min_changes'].lower() == 'true'
+    if args['min_changes'] and not args['plates']:
+        parser.error('-m true needs -p true (no plates are chosen without it)')
+    return args
 
 
-def check_extensions(filename):
-    if not filename.endswith('.csv'):
-        filename += '.csv'
+def check_extensions(filename, fmt='csv'):
+    if not filename.endswith(f'.{fmt}'):
+        filename = f'{filename.removesuffix(".csv")}.{fmt}'
     return filename
 
 
-def update_weights():
+def update_weights(fmt='csv'):
+    from app.solver_cache import SolverCache
+    from app.weight_chart import WeightChart
     print('Updating weights...')
     for bell in ['bar', 'dumb']:
-        WeightChart().make_chart(bell)
+        WeightChart(SolverCache()).make_chart(bell, fmt)
 
 
-def create_cycle_from_input_file(infile, outfile):
+def create_cycle_from_input_file(
+        infile, outfile, cycle_kwargs, record_history=True):
+    from app.incremental import ScheduleCache
+    from app.input_handling import InputReader
+    from app.storage import save_table
     print(f'Creating cycle from {infile}...')
     exercises = InputReader().get_exercises(f'{DATA}/{infile}')
-    schedule = Scheduler(exercises, is_extended=True).make_schedule()
+    # Only exercises whose input rows changed since the last run are rebuilt
+    schedule = ScheduleCache().make_cycle(outfile, exercises, **cycle_kwargs)
     sched_path = f'{DATA}/{outfile}'
-    schedule.to_csv(sched_path, index=False)
+    save_table(schedule, sched_path)
     print('Saved schedule to', sched_path)
+    if record_history:
+        record_training_maxes(exercises)
+    #from app.updating import Updater
     #Updater().update(f'{DATA}/{infile}')
     #print(f'Input file {infile} updated for next cycle')
+
+
+def record_training_maxes(exercises):
+    # Keep every cycle's training maxes, which the input file does not. Only
+    # those that changed since they were last recorded are added, so
+    # remaking the same cycle does not count it again.
+    training_maxes = {
+        name: training_max
+        for day in exercises
+        for kind in day.values()
+        for name, training_max, _ in kind}
+    history = History()
+    latest = history.latest('strength', training_maxes)
+    changed = [
+        (name, training_max)
+        for name, training_max in training_maxes.items()
+        if latest.get(name) != float(training_max)]
+    if changed:
+        history.record('strength', changed)
+    print(f'Added {len(changed)} changed training maxes to the history')
+
+
+def create_cycles_for_roster(roster, outdir, n_workers, fmt, cycle_kwargs):
+    from app.batch import BatchRunner
+    print(f'Creating cycles for roster {roster}...')
+    BatchRunner(f'{DATA}/{outdir}', n_workers, fmt, **cycle_kwargs).run(
+        f'{DATA}/{roster}')
     
 
 if __name__ == '__main__':
@@ -0,0 +1,176 @@
+import bisect
+import json
+import os
+import pickle
+
+
+ASANAS = 'asanas'
+WEEKLY = 'schedules/weekly'
+FOCUSED = 'schedules/focused'
+CATALOG = 'catalog.pickle'
+CATALOG_VERSION = 1
+SKIP = {'template.json'}  # blank asana for copying, not a real one
+FIELDS = {
+    'asana': str,
+    'hindi': str,
+    'english': str,
+    'images': list,
+    'doBothSides': bool,
+    'minTime': (int, float),
+    'maxTime': (int, float)}
+
+
+class CatalogError(ValueError):
+    def __init__(self, errors: list[str]):
+        '''Raised with every problem found in the source files at once'''
+        self.errors = errors
+        super().__init__(
+            f'{len(errors)} problem(s) in asana/schedule files:\n  '
+            + '\n  '.join(errors))
+
+
+class Catalog:
+    def __init__(self, sources: dict):
+        '''Every asana and schedule, compiled from their JSON files
+        Args:
+        - sources: {path: (mtime, parsed JSON)} for every source file
+        '''
+        self.sources = sources
+        self.asanas = {}    # lower-case name -> asana dict
+        self.focused = {}   # focus -> [asana names]
+        weekly = []         # (first week, last week, [asana names])
+        for path, (_, data) in sources.items():
+            folder, name = os.path.split(path)
+            name = name.removesuffix('.json')
+            if folder == ASANAS:
+                self.asanas[name.lower()] = data
+            elif folder == FOCUSED:
+                self.focused[name] = data
+            else:
+                first, last = _week_range(name)
+                weekly.append((first, last, data))
+        weekly.sort(key=lambda w: w[0])
+        # Interval index: week -> schedule by bisecting the first weeks
+        self.first_weeks = [first for first, _, _ in weekly]
+        self.weekly = weekly
+        self._validate()
+
+    def weekly_schedule(self, week: int):
+        i = bisect.bisect_right(self.first_weeks, week) - 1
+        if i < 0 or week > self.weekly[i][1]:
+            raise KeyError(f'No schedule for week {week}')
+        return self.weekly[i][2]
+
+    def focused_schedule(self, focus: str):
+        return self.focused[focus]
+
+    def asana(self, name: str):
+        # Case-insensitive, like file names on macOS
+        return self.asanas[name.lower()]
+
+    @property
+    def n_weeks(self):
+        return self.weekly[-1][1] if self.weekly else 0
+
+    def _validate(self):
+        errors = []
+        for name, data in self.asanas.items():
+            bad = [
+                field for field, kind in FIELDS.items()
+                if not isinstance(data.get(field), kind)]
+            for field in bad:
+                errors.append(f'{name}: bad or missing "{field}"')
+            if not bad and data['minTime'] > data['maxTime']:
+                errors.append(f'{name}: minTime > maxTime')
+        schedules = [
+            (f'week {first}-{last}', names)
+            for first, last, names in self.weekly]
+        schedules += list(self.focused.items())
+        for schedule, names in schedules:
+            for name in names:
+                if name.lower() not in self.asanas:
+                    errors.append(f'{schedule}: no asana "{name}"')
+        for (_, last, _), first in zip(self.weekly, self.first_weeks[1:]):
+            if first <= last:
+                errors.append(f'overlapping weekly schedules at week {first}')
+        if errors:
+            raise CatalogError(errors)
+
+    @classmethod
+    def build(cls, previous: dict = None):
+        '''Compile every source file, reparsing only those whose mtime
+        differs from <previous> ({path: (mtime, data)})
+        '''
+        previous = previous or {}
+        sources = {}
+        errors = []
+        for folder in [ASANAS, WEEKLY, FOCUSED]:
+            for entry in os.scandir(folder):
+                if not entry.name.endswith('.json') or entry.name in SKIP:
+                    continue
+                path = f'{folder}/{entry.name}'
+                mtime = entry.stat().st_mtime
+                if path in previous and previous[path][0] == mtime:
+                    sources[path] = previous[path]
+                    continue
+                try:
+                    with open(path, 'r') as f:
+                        sources[path] = (mtime, json.load(f))
+                except json.decoder.JSONDecodeError as e:
+                    errors.append(f'Formatting error in {path}: {e}')
+        if errors:
+            raise CatalogError(errors)
+        return cls(sources)
+
+    @classmethod
+    def load(cls, path: str = CATALOG):
+        '''Load the compiled catalog in one read, rebuilding (and saving) it
+        first if any source file was added, removed or changed
+        '''
+        sources = None
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                version, sources = pickle.load(f)
+            if version != CATALOG_VERSION:
+                sources = None
+            elif not _changed(sources):
+                return cls(sources)
+        catalog = cls.build(sources)
+        catalog.save(path)
+        return catalog
+
+    def save(self, path: str = CATALOG):
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(
+                (CATALOG_VERSION, self.sources), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+
+def _week_range(name):
+    # "weekly_11_13" -> (11, 13)
+    first, last = name.removeprefix('weekly_').split('_')
+    return int(first), int(last)
+
+
+def _changed(sources):
+    current = {}
+    for folder in [ASANAS, WEEKLY, FOCUSED]:
+        for entry in os.scandir(folder):
+            if entry.name.endswith('.json') and entry.name not in SKIP:
+                current[f'{folder}/{entry.name}'] = entry.stat().st_mtime
+    return current != {path: mtime for path, (mtime, _) in sources.items()}
+
+
+if __name__ == '__main__':
+    # Rebuild from scratch, e.g. to check edited asana/schedule files
+    try:
+        catalog = Catalog.build()
+    except CatalogError as e:
+        print(e)
+        raise SystemExit(1)
+    catalog.save()
+    print(
+        f'{len(catalog.asanas)} asanas, {len(catalog.weekly)} weekly '
+        f'schedules ({catalog.n_weeks} weeks), {len(catalog.focused)} '
+        f'focused schedules')
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+
+# curriculum.py
+# usage
+#   curriculum.py [-n sessions_per_week] [-t minutes ...] [-e] [-c]
+#     [-l lambda] [--seed seed] [-o path]
+#
+# Plans every lesson of the course ahead of time, for every week, session and
+# duration, and saves them to one table (CURRICULUM) that
+# `entrypoint.py -w WEEK -t MINUTES --session N` only looks up.
+import argparse
+import bisect
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+CURRICULUM = 'curriculum.npz'
+CURRICULUM_VERSION = 1
+SESSIONS_PER_WEEK = 3
+DURATIONS = [5, 10, 15, 20, 25]  # minutes, as in the yoga*min.sh scripts
+MAX_SPREAD = 2  # most an asana's chance is scaled up (or 1/x down) by use
+
+
+class Curriculum:
+    def __init__(self, asanas, index, starts, items, times, weeks, meta):
+        '''Every lesson of the course, planned in advance (see plan_course)
+        Args:
+        - asanas: catalog name of every asana used
+        - index: (week - 1, session - 1, duration) -> lesson number, where
+          duration is the position of the lesson's minutes in meta's
+          'durations'
+        - starts: lesson i is items[starts[i]:starts[i + 1]]
+        - items: asana (index into <asanas>) of every hold, lesson by lesson
+        - times: total time (s) of every hold
+        - weeks: the week whose schedule each lesson was drawn from
+        - meta: the options it was planned with, and 'catalog_mtime', the
+          newest asana/schedule file it was planned from
+        '''
+        self.asanas = asanas
+        self.index = index
+        self.starts = starts
+        self.items = items
+        self.times = times
+        self.weeks = weeks
+        self.meta = meta
+
+    @property
+    def n_weeks(self):
+        return self.index.shape[0]
+
+    @property
+    def sessions_per_week(self):
+        return self.index.shape[1]
+
+    def lesson(self, week: int, session: int, minutes: float):
+        '''[(asana name, total time (s)), ...] of a planned lesson, and the
+        week whose schedule it was drawn from
+        '''
+        durations = self.meta['durations']
+        if not 1 <= week <= self.n_weeks:
+            raise KeyError(f'No week {week} in the curriculum')
+        if not 1 <= session <= self.sessions_per_week:
+            raise KeyError(
+                f'No session {session} in the curriculum (it has '
+                f'{self.sessions_per_week} per week)')
+        if minutes not in durations:
+            raise KeyError(
+                f'No {minutes:g} minute lessons in the curriculum (it has '
+                f'{", ".join(f"{d:g}" for d in durations)})')
+        i = self.index[week - 1, session - 1, durations.index(minutes)]
+        hold = slice(self.starts[i], self.starts[i + 1])
+        return (
+            [(str(self.asanas[a]), float(t))
+             for a, t in zip(self.items[hold], self.times[hold])],
+            int(self.weeks[i]))
+
+    def save(self, path: str = CURRICULUM):
+        tmp = f'{path}.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(
+                f,
+                version=CURRICULUM_VERSION,
+                asanas=self.asanas,
+                index=self.index,
+                starts=self.starts,
+                items=self.items,
+                times=self.times,
+                weeks=self.weeks,
+                durations=np.array(self.meta['durations'], dtype=float),
+                options=np.array([
+                    self.meta['seed'], self.meta['lmb'],
+                    self.meta['exact'], self.meta['do_corpse'],
+                    self.meta['catalog_mtime']], dtype=float))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str = CURRICULUM):
+        with np.load(path) as data:
+            if data['version'] != CURRICULUM_VERSION:
+                raise ValueError(
+                    f'{path} is from another version; rebuild it with '
+                    'curriculum.py')
+            seed, lmb, exact, do_corpse, catalog_mtime = data['options']
+            meta = {
+                'durations': data['durations'].tolist(),
+                'seed': int(seed),
+                'lmb': float(lmb),
+                'exact': bool(exact),
+                'do_corpse': bool(do_corpse),
+                'catalog_mtime': float(catalog_mtime)}
+            return cls(
+                data['asanas'], data['index'], data['starts'], data['items'],
+                data['times'], data['weeks'], meta)
+
+
+def plan_course(
+        catalog,
+        sessions_per_week=SESSIONS_PER_WEEK,
+        durations=DURATIONS,
+        seed=0,
+        lmb=0.9,
+        exact=False,
+        do_corpse=True):
+    '''Plan every lesson of the course: <sessions_per_week> sessions of each
+    of <durations> (minutes) for every week of <catalog>, the same for the
+    same <seed>
+
+    Each week's sessions draw their schedule week as entrypoint.py does
+    (the week itself if <exact>, else earlier ones with weight <lmb>**i),
+    and all the sessions of a duration that drew the same schedule are
+    packed together (see packing.pack). Asanas used more often than the
+    others so far in a duration's course are made less likely to be
+    chosen again (by at most MAX_SPREAD), and those used less more likely,
+    so that the whole schedule gets covered.
+    '''
+    # Only needed to plan, not to look lessons up
+    from entrypoint import Asana, choose_week, generate_lessons
+    rng = np.random.default_rng(seed)
+    names = sorted(catalog.asanas)
+    position = {name: i for i, name in enumerate(names)}
+    n_weeks = catalog.n_weeks
+    index = np.zeros(
+        (n_weeks, sessions_per_week, len(durations)), dtype=np.int32)
+    uses = np.zeros((len(durations), len(names)))
+    lessons, weeks = [], []
+    for week in range(1, n_weeks + 1):
+        if exact:
+            drawn = np.full(sessions_per_week, week)
+        else:
+            # One alias table for the week, drawn from for every session
+            drawn = choose_week(week, lmb, rng, sessions_per_week)
+        # One batch per schedule: weeks in the same range share it
+        schedule = np.array([
+            bisect.bisect_right(catalog.first_weeks, w) - 1 for w in drawn])
+        for j in np.unique(schedule):
+            sessions = np.flatnonzero(schedule == j)
+            asana_list = catalog.weekly[j][2]
+            candidates = [
+                Asana(catalog.asana(name), rng=rng) for name in asana_list]
+            if not do_corpse:
+                asana_list = asana_list[:-1]
+            key = {a.name: name.lower() for a, name in zip(
+                candidates, asana_list)}
+            cols = [position[name.lower()] for name in asana_list]
+            for d, minutes in enumerate(durations):
+                used = uses[d, cols]
+                bias = np.clip(
+                    (1 + used.mean()) / (1 + used),
+                    1 / MAX_SPREAD, MAX_SPREAD)
+                batch = generate_lessons(
+                    candidates, minutes * 60, do_corpse, len(sessions), rng,
+                    bias=bias)
+                for session, lesson in zip(sessions, batch):
+                    index[week - 1, session, d] = len(lessons)
+                    holds = [(position[key[a.name]], a.time) for a in lesson]
+                    lessons.append(holds)
+                    weeks.append(drawn[session])
+                    for i, _ in holds:
+                        uses[d, i] += 1
+    starts = np.cumsum([0] + [len(lesson) for lesson in lessons])
+    holds = [hold for lesson in lessons for hold in lesson]
+    meta = {
+        'durations': [float(d) for d in durations],
+        'seed': seed,
+        'lmb': lmb,
+        'exact': exact,
+        'do_corpse': do_corpse,
+        'catalog_mtime': catalog_mtime(catalog)}
+    return Curriculum(
+        np.array(names),
+        index,
+        starts.astype(np.int32),
+        np.array([i for i, _ in holds], dtype=np.uint16),
+        np.array([t for _, t in holds], dtype=np.float32),
+        np.array(weeks, dtype=np.uint8),
+        meta)
+
+
+def catalog_mtime(catalog):
+    '''When the newest of <catalog>'s source files was changed'''
+    return max(mtime for mtime, _ in catalog.sources.values())
+
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(
+        description='plan every lesson of the course in advance')
+    parser.add_argument(
+        '-n',
+        '--sessions',
+        help='sessions per week',
+        type=int,
+        default=SESSIONS_PER_WEEK)
+    parser.add_argument(
+        '-t',
+        '--time',
+        help='lesson times in minutes',
+        type=float,
+        nargs='+',
+        default=DURATIONS)
+    parser.add_argument(
+        '-e',
+        '--exact',
+        help='draw only from each week\'s own schedule',
+        action='store_true')
+    parser.add_argument(
+        '-c', '--nocorpse', help='omit corpse pose', action='store_true')
+    parser.add_argument(
+        '-l', '--lmb', help='lambda for weighting', type=float, default=0.9)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', default=CURRICULUM)
+    args = parser.parse_args(args)
+    assert 0 < args.lmb <= 1, 'lambda must be on (0, 1]'
+    return args
+
+
+if __name__ == '__main__':
+    from entrypoint import load_catalog
+    args = parse_args(sys.argv[1:])
+    curriculum = plan_course(
+        load_catalog(),
+        args.sessions,
+        sorted(set(args.time)),
+        args.seed,
+        args.lmb,
+        args.exact,
+        not args.nocorpse)
+    curriculum.save(args.output)
+    print(
+        f'{len(curriculum.starts) - 1} lessons ({curriculum.n_weeks} weeks, '
+        f'{curriculum.sessions_per_week} sessions a week, '
+        f'{", ".join(f"{d:g}" for d in curriculum.meta["durations"])} '
+        f'minutes) saved to {args.output}')
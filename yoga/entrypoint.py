@@ -3,39 +3,75 @@
 # main.py
 # usage
 #   main.py week [time_in_mins] [include_earlier="true"] [corpse=False]
+#     [-s speech_backend] [--simulate] [--no-history] [--session N]
 #
 #   week: week in course
 #   time_in_mins: (int) total time of yoga session (defaults to 30)
 #   include_earlier: (bool) if true, randomly chooses from all weks up to,
 #     {week}, weighted more heavily toward recent weeks. (defaults to False)
+#   speech_backend: say | espeak | silent (defaults to the first available)
+#   --simulate: fast-forward through the lesson, printing every cue with its
+#     time, without speaking, showing images or waiting
+#   --no-history: neither favour asanas not done lately (see
+#     common/history.py) nor add this lesson to the history
+#   --session: run session N of the week as planned by curriculum.py, which
+#     must have been run first (see there)
 import argparse
-import json
+import copy
+import math
 import os
 import sys
-from time import sleep, time
+from functools import partial
 
-import numpy as np
-import psutil
-from PIL import Image
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from common.lazy import lazy_import
+from common.sampling import AliasSampler
+from catalog import Catalog, CatalogError
+
+np = lazy_import('numpy')
 
 
-WEEKLY = 'schedules/weekly'
-FOCUSED = 'schedules/focused'
-ASANAS = 'asanas'
 IMG = 'images'
+VOICE = 'Rishi'
+HINDI_VOICE = 'Lekha'
+LEAD_IN_S = 5  # from "Beginning the lesson" to the first asana
+
+_catalog = None  # loaded on first use
 
 
 def main(args):
-    week_or_focus, total_time, do_corpse, max_per = parse_args(args)
-    if isinstance(week_or_focus, str):
-        asana_list = load_focused_schedule(week_or_focus)
+    (week_or_focus, total_time, do_corpse, max_per, speech, simulate,
+     no_history, session) = parse_args(args)
+    if no_history:
+        history = None
+    else:
+        from common.history import History
+        history = History()
+    if session is not None:
+        asanas = load_planned_lesson(week_or_focus, session, total_time)
     else:
-        asana_list = load_weekly_schedule(week)
-    candidate_asanas = load_all_asanas(asana_list)
-    candidate_asanas = [Asana(asana, max_per) for asana in candidate_asanas]
-    asanas = generate_lesson(candidate_asanas, total_time, do_corpse)
-    lesson = Lesson(asanas)
+        if isinstance(week_or_focus, str):
+            asana_list = load_focused_schedule(week_or_focus)
+        else:
+            asana_list = load_weekly_schedule(week_or_focus)
+        candidate_asanas = load_all_asanas(asana_list)
+        candidate_asanas = [
+            Asana(asana, max_per) for asana in candidate_asanas]
+        print('Including savasana' if do_corpse else 'Omitting savasana')
+        asanas = generate_lesson(
+            candidate_asanas, total_time, do_corpse, history)
+    if simulate:
+        session = Lesson(asanas, speaker=None).simulate()
+        print(f'Simulated {session.elapsed:.0f} s lesson')
+        return
+    # Only needed to run a lesson, and slow to import (e.g. for --help)
+    from common.speech import Speaker, get_backend
+    from viewer import Viewer
+    lesson = Lesson(
+        asanas, Speaker(VOICE, get_backend(speech)), Viewer(IMG))
     lesson.begin()
+    if history is not None:
+        history.record('yoga', [(a.name, a.time) for a in asanas])
     
 
 def parse_args(args):
@@ -63,107 +99,189 @@ def parse_args(args):
         '--max_per',
         help='maximum minutes per asana',
         type=int,
-        default=np.inf)
+        default=math.inf)
     parser.add_argument(
         '-l', '--lmb', help='lambda for weighting', type=float, default=0.9)
+    parser.add_argument(
+        '-s',
+        '--speech',
+        help='speech backend (say, espeak, silent)',
+        default=None)
+    parser.add_argument(
+        '--simulate',
+        help='fast-forward through the lesson, printing each cue',
+        action='store_true')
+    parser.add_argument(
+        '--no-history',
+        help='do not bias by or add to the practice history',
+        action='store_true')
+    parser.add_argument(
+        '--session',
+        help='run this session of the week as planned in advance by '
+        'curriculum.py (no choosing at all; cannot be combined with -e, -c, '
+        '-x or -l, which were fixed when the curriculum was planned)',
+        type=int)
     args = parser.parse_args()
+    if args.speech is not None:
+        from common.speech import BACKENDS
+        if args.speech not in BACKENDS:
+            parser.error(
+                f'argument -s/--speech: invalid choice: {args.speech!r} '
+                f'(choose from {", ".join(BACKENDS)})')
+    if args.session is not None:
+        planned = [
+            flag for flag, name in [
+                ('-e', 'exact'), ('-c', 'nocorpse'), ('-x', 'max_per'),
+                ('-l', 'lmb')]
+            if getattr(args, name) != parser.get_default(name)]
+        if planned:
+            parser.error(
+                f'--session cannot be combined with {", ".join(planned)}: '
+                'the curriculum was planned with its own options')
     # change times to seconds
     args.time *= 60.
     args.max_per *= 60.
     assert 0 < args.lmb <= 1, 'lambda must be on (0, 1]'
-    if not args.exact:
-        try:
-            probs = np.array([args.lmb**i for i in range(args.week)][::-1])
-            probs = probs / probs.sum()
-            week = int(args.week)
-            week = np.random.choice(range(1, args.week + 1), 1, p=probs)[0]
-        except TypeError:
-            week = str(args.week)
+    try:
+        week = int(args.week)
+    except ValueError:
+        week = str(args.week)
+    if args.session is not None and not isinstance(week, int):
+        parser.error('--session needs a week, not a focus')
+    if not args.exact and isinstance(week, int) and args.session is None:
+        week = choose_week(week, args.lmb)
     do_corpse = not args.nocorpse
-    args = [week, args.time, do_corpse, args.max_per]
+    args = [
+        week, args.time, do_corpse, args.max_per, args.speech, args.simulate,
+        args.no_history, args.session]
     print('Running with args:')
-    for name, val in zip(['week', 'total_time', 'do_corpse', 'max_per'], args):
+    names = [
+        'week', 'total_time', 'do_corpse', 'max_per', 'speech', 'simulate',
+        'no_history', 'session']
+    for name, val in zip(names, args):
         print(f'  {name:10s}: {val}')
     return args
 
 
+def choose_week(week, lmb, rng=None, size=None):
+    '''A week up to <week>, the most recent weighted most (week <week> - i
+    has weight <lmb>**i), or an array of <size> of them drawn at once
+    '''
+    rng = np.random.default_rng() if rng is None else rng
+    sampler = AliasSampler(
+        np.arange(1, week + 1), lmb ** np.arange(week)[::-1])
+    weeks = sampler.sample(rng, size)
+    return int(weeks) if size is None else weeks
+
+
+def load_catalog():
+    global _catalog
+    if _catalog is None:
+        try:
+            _catalog = Catalog.load()
+        except CatalogError as e:
+            print(e)
+            sys.exit()
+    return _catalog
+
+
 def load_focused_schedule(focus):
-    with open(f'{FOCUSED}/{focus}.json', 'r') as f:
-        asana_list = json.load(f)
-    return asana_list
+    try:
+        return load_catalog().focused_schedule(focus)
+    except KeyError:
+        print(f'No focused schedule {focus}')
+        sys.exit()
 
 
 def load_weekly_schedule(week):
-    schedules = [f for f in os.listdir(WEEKLY) if f.endswith('.json')]
-    for schedule in schedules:
-        week_str = schedule.replace('weekly_', '').replace('.json', '')
-        weeks = [int(x) for x in week_str.split('_')]
-        if weeks[0] <= week <= weeks[1]:
-            with open(f'{WEEKLY}/{schedule}', 'r') as f:
-                asana_list = json.load(f)
-            return asana_list
-    print('Schedule not found')
-    sys.exit()
+    try:
+        return load_catalog().weekly_schedule(week)
+    except KeyError:
+        print('Schedule not found')
+        sys.exit()
 
 
 def load_all_asanas(asana_list):
-    asana_objs = []
-    for asana in asana_list:
-        try:
-            with open(f'{ASANAS}/{asana}.json', 'r') as f:
-                asana_objs.append(json.load(f))
-        except FileNotFoundError:
-            print(f'No json file for {asana}')
-            sys.exit()
-        except json.decoder.JSONDecodeError as e:
-            print(f'Formatting error in {asana}.json\n{e}')
-            sys.exit()
-    return asana_objs
+    # Every name in a schedule is checked when the catalog is built
+    catalog = load_catalog()
+    return [catalog.asana(asana) for asana in asana_list]
+
+
+def load_planned_lesson(week, session, lesson_time):
+    '''The lesson planned for <session> of <week> (see curriculum.py)'''
+    from curriculum import CURRICULUM, Curriculum, catalog_mtime
+    catalog = load_catalog()
+    try:
+        curriculum = Curriculum.load()
+        holds, drawn = curriculum.lesson(week, session, lesson_time / 60)
+    except FileNotFoundError:
+        print(f'No {CURRICULUM}; make it with ./curriculum.py')
+        sys.exit()
+    except (KeyError, ValueError) as e:
+        print(e.args[0])
+        sys.exit()
+    if curriculum.meta['catalog_mtime'] != catalog_mtime(catalog):
+        print(
+            'Asana or schedule files changed since the curriculum was '
+            'planned; plan it again with ./curriculum.py')
+        sys.exit()
+    print(f'Planned lesson from the week {drawn} schedule')
+    return [
+        Asana(catalog.asana(name), time=time) for name, time in holds]
+
 
-        
 class Asana:
-    def __init__(self, asana_obj, max_per=np.inf):
+    def __init__(self, asana_obj, max_per=math.inf, rng=None, time=None):
+        '''
+        Args:
+        - rng: np.random.Generator for the hold time (default: numpy's
+          global one)
+        - time: total time (s), if already decided (then nothing is drawn)
+        '''
         self.name = asana_obj['asana']
         if self.name == 'savasana': # max_per doesn't apply to corpse pose
-            max_per = np.inf
+            max_per = math.inf
         self.hindi = asana_obj['hindi']
         self.english = asana_obj['english']
         self.images = asana_obj['images']
         self.min_time = asana_obj['minTime']
         self.max_time = min(asana_obj['maxTime'], max_per)
         self.do_both_sides = asana_obj['doBothSides']
-        self.time_per_side = int(
-            round(np.random.uniform(self.min_time, self.max_time)))
-        self.total_time = (
-            2 * self.time_per_side if self.do_both_sides
-            else self.time_per_side)
+        self.sides = 2 if self.do_both_sides else 1
         self.img = asana_obj.get('imgFile', None)
+        if time is not None:
+            self.time = time
+            return
+        self.time_per_side = int(
+            round((rng or np.random).uniform(self.min_time, self.max_time)))
+        self.total_time = self.sides * self.time_per_side
 
     def __str__(self):
         return self.name
 
-    def begin(self, current_im=None):
-        if current_im is not None:
-            current_im.close()
-        im = None
-        if self.img is not None:
-            try:
-                im = Image.open(f'{IMG}/{self.img}')
-                im.show()
-            except BaseException as e:
-                print(f'Failed to open {self.img}\n{e}')
-        print(
+    def cues(self):
+        '''(text, voice) of everything said for this asana'''
+        cues = [
+            (self.hindi, HINDI_VOICE),
+            (f'{self.english} for {standardize_time(self.time_per_side)}',
+             VOICE)]
+        if self.do_both_sides:
+            cues.append(('other side', VOICE))
+        return cues
+
+    def describe(self):
+        return (
             f'{self.name}: {self.english} ({self.hindi})'
             f'({standardize_time(self.time_per_side)}; '
             f'images: {", ".join([str(x) for x in self.images])})')
-        say(self.hindi, voice='Lekha')
-        say(f'{self.english} for {standardize_time(self.time_per_side)}')
-        return im
+
+    def announce(self, speaker):
+        for text, voice in self.cues()[:2]:
+            speaker.say(text, voice)
         
-    def switch_sides(self):
+    def switch_sides(self, speaker):
         if self.do_both_sides:
-            print('other side')
-            say('other side')
+            speaker.say('other side')
         else:
             raise ValueError(
                 f'{self.name} does not have left and right versions')
@@ -172,9 +290,17 @@ class Asana:
     def time(self):
         return self.total_time
 
+    @time.setter
+    def time(self, total_time):
+        self.total_time = total_time
+        self.time_per_side = total_time / self.sides
 
-def say(text, voice='Rishi'):
-    os.system(f'say -v {voice} {text}')
+    @property
+    def time_range(self):
+        '''Shortest and longest total time'''
+        return (
+            self.sides * min(self.min_time, self.max_time),
+            self.sides * self.max_time)
 
 
 def standardize_time(time_in_s):
@@ -190,75 +316,131 @@ def standardize_time(time_in_s):
     return f'{minutes}{seconds}'
 
 
-def generate_lesson(candidate_asanas, lesson_time, do_corpse):
-    # For each lesson, if time is not sufficient for all asanas, do a random
-    # subset that will fit in the time allowed, but maintain the progression
-    # order
-    n = len(candidate_asanas)
-    asanas = [None] * n
-    if do_corpse:
-        # Automatically add savasana
-        print('Including savasana')
-        asanas[-1] = candidate_asanas[-1]
-        elapsed_time = candidate_asanas[-1].time
-    else:
-        print('Omitting savasana')
-        elapsed_time = 0
-    indices = np.array(range(n - 1))
-    np.random.shuffle(indices)
-    indices = list(indices)
-    while indices:
-        i = indices.pop()
-        next_asana = candidate_asanas[i]
-        asana_time = next_asana.time
-        if elapsed_time + asana_time > lesson_time:
-            break
-        asanas[i] = candidate_asanas[i]
-        elapsed_time += asana_time
-    asanas = [a for a in asanas if a is not None]
-    # Adjust time each to make exact
-    if elapsed_time !=lesson_time:
-        asanas = adjust_times(asanas, lesson_time, elapsed_time)
-    return asanas
-
-
-def adjust_times(asanas, lesson_time, elapsed_time):
-    print('Updating time each...')
-    factor = lesson_time / elapsed_time
-    for a in asanas:
-        a.time_per_side *= factor
-        a.total_time *= factor
-    return asanas
+def generate_lesson(candidate_asanas, lesson_time, do_corpse, history=None):
+    return generate_lessons(
+        candidate_asanas, lesson_time, do_corpse, history=history)[0]
+
+
+def generate_lessons(
+        candidate_asanas,
+        lesson_time,
+        do_corpse,
+        k=1,
+        rng=None,
+        history=None,
+        bias=None):
+    '''<k> different lessons of exactly <lesson_time> s, each a subset of
+    <candidate_asanas> in progression order, with every hold fitted within
+    its asana's min and max time (see packing.pack)
+    Args:
+    - history: if given (a common.history.History), asanas not done lately
+      are up to twice as likely to be chosen
+    - bias: how much more likely each asana is to be chosen (see
+      packing.pack), on top of <history>
+    '''
+    if not do_corpse:
+        # savasana is last
+        candidate_asanas = candidate_asanas[:-1]
+    from packing import pack
+    lo, hi = np.array([a.time_range for a in candidate_asanas]).T
+    fixed = np.zeros(len(candidate_asanas), dtype=bool)
+    fixed[-1] = do_corpse
+    if history is not None:
+        staleness = 1 + history.staleness(
+            'yoga', [a.name for a in candidate_asanas])
+        bias = staleness if bias is None else bias * staleness
+    chosen, times = pack(
+        lo, hi, [a.time for a in candidate_asanas], lesson_time, fixed, k,
+        rng, bias)
+    lessons = []
+    for mask, lesson_times in zip(chosen, times):
+        lesson = []
+        for i in np.flatnonzero(mask):
+            asana = copy.copy(candidate_asanas[i])
+            asana.time = lesson_times[i]
+            lesson.append(asana)
+        lessons.append(lesson)
+    return lessons
 
 
 class Lesson:
-    def __init__(self, asanas):
+    def __init__(self, asanas, speaker, viewer=None):
+        '''<speaker> and <viewer> are only needed to run the lesson, not to
+        simulate it
+        '''
         self.asanas = asanas
+        self.speaker = speaker
+        self.viewer = viewer
+
+    def session(self, clock=None, sink=None):
+        '''The lesson as a Session (see common.session)'''
+        from common.session import Session
+        session = Session(clock, sink)
+        session.add(
+            0,
+            'Beginning the lesson.',
+            partial(self._say, 'Beginning the lesson.'))
+        t = LEAD_IN_S
+        imgs = [asana.img for asana in self.asanas] + [None]
+        for asana, next_img in zip(self.asanas, imgs[1:]):
+            # The next image is prepared during this hold
+            session.add(
+                t,
+                f'{asana} image',
+                partial(self._show_img, asana.img, next_img),
+                'image')
+            session.add(
+                t, asana.describe(), partial(asana.announce, self.speaker))
+            if asana.do_both_sides:
+                session.add(
+                    t + asana.time_per_side,
+                    f'{asana} other side',
+                    partial(asana.switch_sides, self.speaker))
+            t += asana.time
+            session.add(t, f'{asana} close image', self._close_img, 'image')
+        session.add(t, 'नमस्ते', partial(self._say, 'नमस्ते', HINDI_VOICE))
+        return session
 
     def begin(self):
-        say('Beginning the lesson.')
-        sleep(5)
-        start = time()
-        im = None
+        # Render every cue up front so nothing is synthesized mid-lesson
+        self.speaker.prerender(['Beginning the lesson.'])
+        self.speaker.prerender(['नमस्ते'], HINDI_VOICE)
         for asana in self.asanas:
-            do_both_sides = asana.do_both_sides
-            asana_time = asana.time_per_side
-            im = asana.begin(im)
-            sleep(asana_time)
-            if do_both_sides:
-                asana.switch_sides()
-                sleep(asana_time)
-            self._close_img()
-        elapsed_time = time() - start
-        say('नमस्ते', voice='Lekha')
-        print('Elapsed time:', elapsed_time)
-
-    @staticmethod
-    def _close_img():
-        for proc in psutil.process_iter():
-            if proc.name() == 'Preview':
-                proc.kill()
-                break
+            for text, voice in asana.cues():
+                self.speaker.clip(text, voice)
+        from common.session import print_cue
+        from common.telemetry import TelemetryLog
+        self.viewer.prefetch(self.asanas[0].img if self.asanas else None)
+        session = self.session(sink=print_cue)
+        try:
+            session.run()
+        finally:
+            self.viewer.shutdown()
+        session.report()
+        print('Elapsed time:', session.elapsed - LEAD_IN_S)
+        TelemetryLog().record(
+            'yoga', session, {'asanas': [a.name for a in self.asanas]})
+
+    def simulate(self, sink=None):
+        '''Fast-forward through the lesson without speaking, showing images
+        or waiting; each cue is passed to <sink> (default: print_cue) with
+        its time
+        '''
+        if sink is None:
+            from common.session import print_cue
+            sink = print_cue
+        session = self.session(sink=sink)
+        session.simulate()
+        return session
+
+    def _say(self, text, voice=None):
+        self.speaker.say(text, voice)
+
+    def _show_img(self, img, next_img):
+        self.viewer.show(img, next_img)
+
+    def _close_img(self):
+        self.viewer.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,90 @@
+from common.lazy import lazy_import
+
+np = lazy_import('numpy')
+
+
+def pack(
+        lo, hi, preferred, lesson_time, fixed=None, k=1, rng=None,
+        bias=None):
+    '''Choose which asanas to do, in <k> different lessons at once, and how
+    long to hold each so that every lesson lasts exactly <lesson_time>
+    without any hold going outside its [lo, hi] range
+
+    Selection is a 0/1 knapsack over the minimum times (whole seconds),
+    solved for all <k> lessons together: each lesson gives the asanas its
+    own random value (1 to 2, times <bias>), which is what makes the
+    lessons differ. A subset only counts if its maximum
+    times add up to at least <lesson_time>, so holds can always be
+    stretched to fit. Picking a subset, never reordering it, keeps the
+    progression order.
+    Args:
+    - lo, hi: minimum and maximum total time (s) of each asana
+    - preferred: time (s) of each asana before fitting, within [lo, hi]
+    - fixed: mask of asanas every lesson must include (e.g. savasana)
+    - rng: np.random.Generator
+    - bias: how much each asana's random value is scaled by (e.g. to favour
+      some), default 1
+    Returns:
+    - chosen: (k, n) mask of the asanas in each lesson
+    - times: (k, n) total time of each asana in each lesson (0 if not
+      chosen)
+    '''
+    lo, hi = np.asarray(lo, dtype=float), np.asarray(hi, dtype=float)
+    preferred = np.asarray(preferred, dtype=float)
+    n = len(lo)
+    fixed = np.zeros(n, dtype=bool) if fixed is None else np.asarray(fixed)
+    rng = np.random.default_rng() if rng is None else rng
+    bias = np.ones(n) if bias is None else np.asarray(bias, dtype=float)
+    chosen = _select(lo, hi, lesson_time, fixed, k, rng, bias)
+    return chosen, _fit(lo, hi, preferred, lesson_time, chosen)
+
+
+def _select(lo, hi, lesson_time, fixed, k, rng, bias):
+    n = len(lo)
+    size = np.ceil(lo).astype(int)
+    capacity = max(int(lesson_time - size[fixed].sum()), 0)
+    value = bias * (1 + rng.random((k, n)))
+    # best[j, c]: highest value of a subset whose sizes add up to exactly c
+    # in lesson j; reach[j, c]: sum of the maximum times of that subset
+    best = np.full((k, capacity + 1), -np.inf)
+    best[:, 0] = 0
+    reach = np.full((k, capacity + 1), hi[fixed].sum())
+    take = np.zeros((n, k, capacity + 1), dtype=bool)
+    for i in np.flatnonzero(~fixed):
+        s = size[i]
+        if s > capacity:
+            continue
+        value_with = best[:, :capacity + 1 - s] + value[:, i, None]
+        better = value_with > best[:, s:]
+        take[i, :, s:] = better
+        best[:, s:] = np.where(better, value_with, best[:, s:])
+        reach[:, s:] = np.where(
+            better, reach[:, :capacity + 1 - s] + hi[i], reach[:, s:])
+    feasible = np.isfinite(best) & (reach >= lesson_time)
+    c = np.argmax(np.where(feasible, best, -np.inf), axis=1)
+    rows = np.arange(k)
+    chosen = np.zeros((k, n), dtype=bool)
+    for i in reversed(range(n)):
+        chosen[:, i] = take[i, rows, c]
+        c = c - size[i] * chosen[:, i]
+    chosen |= fixed
+    # Not even every asana at its maximum fills the lesson: do them all
+    chosen[~feasible.any(axis=1)] = True
+    return chosen
+
+
+def _fit(lo, hi, preferred, lesson_time, chosen):
+    # Move every chosen hold the same fraction of the way from its preferred
+    # time toward its max (lesson too short) or its min (too long)
+    times = np.where(chosen, preferred, 0)
+    gap = lesson_time - times.sum(axis=1, keepdims=True)
+    room = np.where(gap >= 0, hi - preferred, preferred - lo) * chosen
+    total_room = room.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        fraction = np.clip(np.nan_to_num(gap / total_room), -1, 1)
+    times = times + fraction * room
+    # Only when the bounds cannot be met: scale everything to fit
+    with np.errstate(divide='ignore', invalid='ignore'):
+        factor = np.nan_to_num(
+            lesson_time / times.sum(axis=1, keepdims=True), nan=1)
+    return times * factor
@@ -0,0 +1,83 @@
+import hashlib
+import os
+import shutil
+import subprocess
+
+from common.lazy import lazy_import
+
+futures = lazy_import('concurrent.futures')
+Image = lazy_import('PIL.Image')
+
+
+CACHE = os.path.expanduser('~/.cache/fitness/images')
+MAX_PX = 1024  # longest side of a cached thumbnail
+# Viewers that stay in the foreground, so the process we start is the window
+# and closing it is one terminate (macOS Quick Look, then Linux viewers)
+VIEWERS = [['qlmanage', '-p'], ['feh', '--scale-down'], ['eog'], ['display']]
+
+
+class Viewer:
+    def __init__(self, img_dir: str, cache_dir: str = CACHE):
+        '''Shows one image at a time. Images are downsized into an on-disk
+        thumbnail cache by a background thread, so the next asana's image
+        can be ready before its hold starts.
+        Args:
+        - img_dir: where the full-size images are
+        '''
+        self.img_dir = img_dir
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cmd = next(
+            (viewer for viewer in VIEWERS if shutil.which(viewer[0])), None)
+        self.pool = futures.ThreadPoolExecutor(max_workers=1)
+        self.pending = {}  # image -> future of its thumbnail path
+        self.proc = None
+
+    def prefetch(self, img: str):
+        '''Start making the thumbnail for <img> in the background'''
+        if img is not None and img not in self.pending:
+            self.pending[img] = self.pool.submit(self.thumbnail, img)
+
+    def thumbnail(self, img: str):
+        '''Path to the cached, downsized copy of <img>, making it if needed'''
+        src = f'{self.img_dir}/{img}'
+        key = hashlib.sha1(
+            f'{src}\x1f{os.path.getmtime(src)}\x1f{MAX_PX}'.encode())
+        path = f'{self.cache_dir}/{key.hexdigest()}.png'
+        if not os.path.exists(path):
+            with Image.open(src) as im:
+                im.thumbnail((MAX_PX, MAX_PX))
+                tmp = f'{path}.tmp.png'
+                im.save(tmp)
+            os.replace(tmp, path)
+        return path
+
+    def show(self, img: str, next_img: str = None):
+        '''Replace the image being shown with <img>, then start preparing
+        <next_img>
+        '''
+        self.close()
+        if img is not None:
+            self.prefetch(img)
+            try:
+                path = self.pending.pop(img).result()
+                if self.cmd is None:
+                    with Image.open(path) as im:
+                        im.show()  # no handle, so it cannot be closed
+                else:
+                    self.proc = subprocess.Popen(
+                        self.cmd + [path],
+                        stdout=subprocess.DEVNULL,
+                        stderr=subprocess.DEVNULL)
+            except Exception as e:
+                print(f'Failed to open {img}\n{e}')
+        self.prefetch(next_img)
+
+    def close(self):
+        if self.proc is not None:
+            self.proc.terminate()
+            self.proc = None
+
+    def shutdown(self):
+        self.close()
+        self.pool.shutdown(cancel_futures=True)